@@ -1,25 +1,183 @@
+import atexit
+import logging
+import threading
+import time
 from datetime import timedelta
-from rest_framework.authentication import TokenAuthentication
+from rest_framework.authentication import TokenAuthentication, get_authorization_header
+from rest_framework.authtoken.models import Token
 from rest_framework import exceptions
+from django.db import DatabaseError, transaction
 from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
 
 
+TOKEN_LIFETIME = timedelta(minutes=100)
+
+logger = logging.getLogger(__name__)
+
+
+class TokenActivityCache:
+    def __init__(self, ttl=60, flush_interval=30, max_pending=1000):
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._tokens = {}
+        self._last_seen = {}
+        self._pending = set()
+        self._last_flush = time.monotonic()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._tokens.get(key)
+        if entry is None or time.monotonic() - entry[2] > self.ttl:
+            return None
+        return entry[0], entry[1]
+
+    def remember(self, user, token):
+        with self._lock:
+            self._tokens[token.key] = (user, token, time.monotonic())
+
+    def last_seen(self, token):
+        with self._lock:
+            last_seen = self._last_seen.get(token.key)
+        if last_seen is None or last_seen < token.created:
+            return token.created
+        return last_seen
+
+    def touch(self, token, now):
+        # Returns whether the pending timestamps are due to be flushed.
+        with self._lock:
+            self._last_seen[token.key] = now
+            self._pending.add(token.key)
+            return (len(self._pending) >= self.max_pending
+                    or time.monotonic() - self._last_flush >= self.flush_interval)
+
+    def forget(self, key):
+        with self._lock:
+            self._tokens.pop(key, None)
+            self._last_seen.pop(key, None)
+            self._pending.discard(key)
+
+    def forget_user(self, user_id):
+        # Cached users go stale when the row changes (deactivation, new
+        # password); the pending last-seen times are kept.
+        with self._lock:
+            for key in [key for key, entry in self._tokens.items() if entry[0].pk == user_id]:
+                del self._tokens[key]
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+            self._last_seen.clear()
+            self._pending.clear()
+
+    def _take_pending(self):
+        with self._lock:
+            pending = [Token(key=key, created=self._last_seen[key]) for key in self._pending]
+            self._pending.clear()
+            self._last_flush = time.monotonic()
+        return pending
+
+    def _requeue(self, pending, exc):
+        # The request goes on; the timestamps are written by a later flush.
+        logger.warning('Could not save the last use of %d tokens: %s', len(pending), exc)
+        with self._lock:
+            self._pending.update(token.key for token in pending if token.key in self._last_seen)
+
+    def flush(self):
+        pending = self._take_pending()
+        if pending:
+            try:
+                with transaction.atomic():
+                    Token.objects.bulk_update(pending, ['created'], batch_size=500)
+            except DatabaseError as exc:
+                self._requeue(pending, exc)
+
+    async def aflush(self):
+        pending = self._take_pending()
+        if pending:
+            try:
+                await Token.objects.abulk_update(pending, ['created'], batch_size=500)
+            except DatabaseError as exc:
+                self._requeue(pending, exc)
+
 
 class ProblemBookTokenAuthentication(TokenAuthentication):
+    activity = TokenActivityCache()
+
+    def is_expired(self, user, token, now):
+        return not user.is_superuser and self.activity.last_seen(token) < now - TOKEN_LIFETIME
+
     def authenticate_credentials(self, key):
-        user, token = super().authenticate_credentials(key)
-        time_now = (timezone.now() - timedelta(minutes=100)).replace(tzinfo=None)
-        if user.is_superuser:
-            token.created = timezone.now()
-            token.save()
-        elif token.created.replace(tzinfo=None) < time_now:
-            token.delete()
+        cached = self.activity.get(key)
+        if cached is None:
+            user, token = super().authenticate_credentials(key)
+            self.activity.remember(user, token)
+        else:
+            user, token = cached
+            if not user.is_active:
+                self.activity.forget(key)
+                raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        now = timezone.now()
+        if self.is_expired(user, token, now):
+            self.activity.forget(key)
+            Token.objects.filter(key=key).delete()
             raise exceptions.AuthenticationFailed("Your token has expired")
+        token.created = now
+        if self.activity.touch(token, now):
+            self.activity.flush()
+
+        return user, token
+
+    async def aauthenticate(self, request):
+        # authenticate() for plain async Django views, on the async ORM.
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) == 1:
+            raise exceptions.AuthenticationFailed(_('Invalid token header. No credentials provided.'))
+        elif len(auth) > 2:
+            raise exceptions.AuthenticationFailed(_('Invalid token header. Token string should not contain spaces.'))
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(_('Invalid token header. Token string should not contain invalid characters.'))
+        return await self.aauthenticate_credentials(key)
+
+    async def aauthenticate_credentials(self, key):
+        cached = self.activity.get(key)
+        if cached is None:
+            try:
+                token = await Token.objects.select_related('user').aget(key=key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            if not token.user.is_active:
+                raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+            user = token.user
+            self.activity.remember(user, token)
         else:
-            token.created = timezone.now()
-            token.save()
+            user, token = cached
+            if not user.is_active:
+                self.activity.forget(key)
+                raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        now = timezone.now()
+        if self.is_expired(user, token, now):
+            self.activity.forget(key)
+            await Token.objects.filter(key=key).adelete()
+            raise exceptions.AuthenticationFailed("Your token has expired")
+        token.created = now
+        if self.activity.touch(token, now):
+            await self.activity.aflush()
 
         return user, token
-    
 
 
+def _flush_token_activity():
+    try:
+        ProblemBookTokenAuthentication.activity.flush()
+    except DatabaseError:
+        pass
+
+
+atexit.register(_flush_token_activity)
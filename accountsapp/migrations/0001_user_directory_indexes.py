@@ -0,0 +1,42 @@
+from django.db import migrations
+
+
+# Indexes for the user directory's prefix search (username__istartswith,
+# email__istartswith) on auth_user, which this project does not own. Django
+# matches istartswith with UPPER(col::text) LIKE UPPER(...) on PostgreSQL,
+# so the index is on that expression with text_pattern_ops to serve LIKE in
+# any collation; SQLite's LIKE is case-insensitive and uses NOCASE indexes.
+POSTGRESQL_FORWARD = [
+    "CREATE INDEX auth_user_username_upper_like ON auth_user (UPPER(username::text) text_pattern_ops)",
+    "CREATE INDEX auth_user_email_upper_like ON auth_user (UPPER(email::text) text_pattern_ops)",
+]
+SQLITE_FORWARD = [
+    "CREATE INDEX auth_user_username_nocase ON auth_user (username COLLATE NOCASE)",
+    "CREATE INDEX auth_user_email_nocase ON auth_user (email COLLATE NOCASE)",
+]
+BACKWARD = {
+    'postgresql': ["DROP INDEX IF EXISTS auth_user_username_upper_like", "DROP INDEX IF EXISTS auth_user_email_upper_like"],
+    'sqlite': ["DROP INDEX IF EXISTS auth_user_username_nocase", "DROP INDEX IF EXISTS auth_user_email_nocase"],
+}
+
+
+def create_prefix_indexes(apps, schema_editor):
+    statements = {'postgresql': POSTGRESQL_FORWARD, 'sqlite': SQLITE_FORWARD}.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    for statement in BACKWARD.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
@@ -0,0 +1,10 @@
+from rest_framework.pagination import CursorPagination
+
+
+
+class UserDirectoryPagination(CursorPagination):
+    # Keyset on the unique username: every page is an index range scan.
+    ordering = 'username'
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
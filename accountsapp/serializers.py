@@ -7,4 +7,17 @@ class UserSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = User
-        fields = ['id', 'username', 'email', 'first_name', 'last_name', 'password']
\ No newline at end of file
+        fields = ['id', 'username', 'email', 'first_name', 'last_name', 'password']
+        extra_kwargs = {'password': {'write_only': True}}
+
+
+DIRECTORY_FIELDS = ['id', 'username', 'first_name', 'last_name', 'email']
+
+
+class UserDirectorySerializer(serializers.ModelSerializer):
+    tasks_created = serializers.IntegerField(read_only=True)
+    tasks_assigned = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = User
+        fields = DIRECTORY_FIELDS + ['tasks_created', 'tasks_assigned']
\ No newline at end of file
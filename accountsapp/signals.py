@@ -0,0 +1,18 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from .authentication import ProblemBookTokenAuthentication
+
+
+# The token cache is per process: other workers still see a deleted token or
+# a deactivated user until their entries expire (TokenActivityCache.ttl).
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    ProblemBookTokenAuthentication.activity.forget(instance.key)
+
+
+@receiver(post_save, sender=User)
+def forget_changed_user(sender, instance, **kwargs):
+    ProblemBookTokenAuthentication.activity.forget_user(instance.pk)
@@ -4,6 +4,15 @@ from django.contrib.auth.models import User
 from rest_framework.test import APIClient
 from rest_framework import status
 from .serializers import UserSerializer
+from .authentication import ProblemBookTokenAuthentication, TokenActivityCache
+from rest_framework.authtoken.models import Token
+from rest_framework import exceptions
+from django.db import DatabaseError, connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from datetime import timedelta
+from unittest import mock
+from mainapp.models import TaskCard
 
 
 
@@ -88,6 +97,46 @@ class UserModelViewSetTest(TestCase):
             self.user.refresh_from_db()
 
 
+class UserDirectoryTest(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.viewer = User.objects.create_user(username='viewer', password='viewerpassword')
+        self.anna = User.objects.create_user(username='anna', email='anna@example.com', password='annapassword')
+        self.andrew = User.objects.create_user(username='andrew', email='drew@example.com', password='andrewpassword')
+        User.objects.create_user(username='bob', email='An.bob@example.com', password='bobpassword')
+        User.objects.create_user(username='gone', is_active=False)
+        TaskCard.objects.create(text='One', creator=self.anna, executor=self.andrew)
+        TaskCard.objects.create(text='Two', creator=self.anna, executor=self.anna)
+
+    def test_requires_authentication(self):
+        self.assertEqual(self.client.get('/accounts/api/users/directory/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_pages_with_counts_in_one_query(self):
+        self.client.force_authenticate(self.viewer)
+        with self.assertNumQueries(1):
+            response = self.client.get('/accounts/api/users/directory/', {'page_size': 2})
+        self.assertEqual(response.data['results'], [
+            {'id': self.andrew.pk, 'username': 'andrew', 'first_name': '', 'last_name': '', 'email': 'drew@example.com',
+             'tasks_created': 0, 'tasks_assigned': 1},
+            {'id': self.anna.pk, 'username': 'anna', 'first_name': '', 'last_name': '', 'email': 'anna@example.com',
+             'tasks_created': 2, 'tasks_assigned': 1},
+        ])
+        response = self.client.get(response.data['next'])
+        self.assertEqual([user['username'] for user in response.data['results']], ['bob', 'viewer'])
+        self.assertIsNone(response.data['next'])
+
+    def test_prefix_search_on_username_and_email(self):
+        self.client.force_authenticate(self.viewer)
+        response = self.client.get('/accounts/api/users/directory/', {'q': 'AN'})
+        self.assertEqual([user['username'] for user in response.data['results']], ['andrew', 'anna', 'bob'])
+        response = self.client.get('/accounts/api/users/directory/', {'q': 'drew'})
+        self.assertEqual([user['username'] for user in response.data['results']], ['andrew'])
+
+    def test_password_hash_is_never_listed(self):
+        response = self.client.get('/accounts/api/users/')
+        self.assertNotIn('password', response.data[0])
+
+
 class UserSerializerTest(TestCase):
 
     def test_create_user(self):
@@ -106,3 +155,84 @@ class UserSerializerTest(TestCase):
         self.assertEqual(user.first_name, user_data['first_name'])
         self.assertEqual(user.last_name, user_data['last_name'])
         self.assertIsNotNone(user.id)
+
+
+class TokenAuthenticationTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='tokenuser', password='tokenpassword')
+        self.token = Token.objects.create(user=self.user)
+        self.activity = TokenActivityCache(flush_interval=3600)
+        patcher = mock.patch.object(ProblemBookTokenAuthentication, 'activity', self.activity)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.auth = ProblemBookTokenAuthentication()
+
+    def test_cached_token_needs_no_queries(self):
+        self.auth.authenticate_credentials(self.token.key)
+        with self.assertNumQueries(0):
+            user, token = self.auth.authenticate_credentials(self.token.key)
+        self.assertEqual(user, self.user)
+
+    def test_last_seen_is_written_in_batches(self):
+        old = timezone.now() - timedelta(minutes=50)
+        Token.objects.filter(key=self.token.key).update(created=old)
+        self.auth.authenticate_credentials(self.token.key)
+        self.assertEqual(Token.objects.get(key=self.token.key).created, old)
+        with CaptureQueriesContext(connection) as queries:
+            self.activity.flush()
+        self.assertEqual([query['sql'].split()[0] for query in queries if 'SAVEPOINT' not in query['sql']], ['UPDATE'])
+        self.assertGreater(Token.objects.get(key=self.token.key).created, old)
+
+    def test_deleted_token_and_deactivated_user_are_not_cached(self):
+        self.auth.authenticate_credentials(self.token.key)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+        self.user.is_active = True
+        self.user.save()
+        self.auth.authenticate_credentials(self.token.key)
+        self.token.delete()
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+
+    def test_failed_flush_is_retried(self):
+        old = timezone.now() - timedelta(minutes=50)
+        Token.objects.filter(key=self.token.key).update(created=old)
+        self.auth.authenticate_credentials(self.token.key)
+        with mock.patch.object(Token.objects, 'bulk_update', side_effect=DatabaseError('locked')), \
+                self.assertLogs('accountsapp.authentication', 'WARNING'):
+            self.activity.flush()
+        self.assertEqual(Token.objects.get(key=self.token.key).created, old)
+        self.activity.flush()
+        self.assertGreater(Token.objects.get(key=self.token.key).created, old)
+
+    def test_expired_token(self):
+        Token.objects.filter(key=self.token.key).update(created=timezone.now() - timedelta(minutes=101))
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            self.auth.authenticate_credentials(self.token.key)
+        self.assertFalse(Token.objects.filter(key=self.token.key).exists())
+
+    def test_expiry_slides_in_memory(self):
+        self.auth.authenticate_credentials(self.token.key)
+        later = timezone.now() + timedelta(minutes=90)
+        with mock.patch('django.utils.timezone.now', return_value=later):
+            self.auth.authenticate_credentials(self.token.key)
+        with mock.patch('django.utils.timezone.now', return_value=later + timedelta(minutes=90)):
+            self.auth.authenticate_credentials(self.token.key)
+        with mock.patch('django.utils.timezone.now', return_value=later + timedelta(minutes=191)):
+            with self.assertRaises(exceptions.AuthenticationFailed):
+                self.auth.authenticate_credentials(self.token.key)
+
+    async def test_async_path_shares_the_cache(self):
+        user, token = await self.auth.aauthenticate_credentials(self.token.key)
+        self.assertEqual(user, self.user)
+        self.assertEqual(self.auth.authenticate_credentials(self.token.key)[0], self.user)
+        await self.activity.aflush()
+        self.assertGreaterEqual((await Token.objects.aget(key=self.token.key)).created, token.created)
+
+    async def test_async_expired_token(self):
+        await Token.objects.filter(key=self.token.key).aupdate(created=timezone.now() - timedelta(minutes=101))
+        with self.assertRaises(exceptions.AuthenticationFailed):
+            await self.auth.aauthenticate_credentials(self.token.key)
+        self.assertFalse(await Token.objects.filter(key=self.token.key).aexists())
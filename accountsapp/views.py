@@ -5,7 +5,13 @@ from django.views.generic import CreateView, TemplateView
 from django.urls import reverse_lazy
 from rest_framework.viewsets import ModelViewSet
 from django.contrib.auth.models import User
-from .serializers import UserSerializer
+from .serializers import DIRECTORY_FIELDS, UserDirectorySerializer, UserSerializer
+from .pagination import UserDirectoryPagination
+from mainapp.models import TaskCard
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.authtoken.models import Token
 from rest_framework.response import Response
@@ -39,10 +45,27 @@ class Logout(LoginRequiredMixin, LogoutView):
     success_url = reverse_lazy('login_page')
 
 
+def task_count(field):
+    # A correlated COUNT per user, served by the (creator|executor, status)
+    # indexes; joining both relations for Count() would multiply the rows.
+    tasks = TaskCard.objects.filter(**{field: OuterRef('pk')}).order_by().values(field).annotate(total=Count('pk'))
+    return Coalesce(Subquery(tasks.values('total'), output_field=IntegerField()), 0)
+
+
 class UserModelViewSet(ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
 
+    @action(detail=False, permission_classes=[IsAuthenticated], pagination_class=UserDirectoryPagination)
+    def directory(self, request):
+        users = (User.objects.filter(is_active=True).only(*DIRECTORY_FIELDS)
+                 .annotate(tasks_created=task_count('creator'), tasks_assigned=task_count('executor')))
+        query = request.query_params.get('q', '').strip()
+        if query:
+            users = users.filter(Q(username__istartswith=query) | Q(email__istartswith=query))
+        page = self.paginate_queryset(users)
+        return self.get_paginated_response(UserDirectorySerializer(page, many=True).data)
+
 
 class ProblemBookAuthToken(ObtainAuthToken):
     def post(self, request, *args, **kwargs):
@@ -0,0 +1,33 @@
+import os
+import statistics
+import sys
+from pathlib import Path
+
+
+def setup():
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'problem_book_site.settings')
+    import django
+    django.setup()
+
+
+def api_client():
+    # DEBUG's default ALLOWED_HOSTS accept localhost but not 'testserver'.
+    from rest_framework.test import APIClient
+    return APIClient(SERVER_NAME='localhost')
+
+
+def latency_report(latencies, seconds=None):
+    # Also used by manage.py replay for its per-route summaries, which have
+    # no wall-clock time of their own.
+    milliseconds = [latency * 1000 for latency in latencies]
+    percentiles = statistics.quantiles(milliseconds, n=100) if len(milliseconds) > 1 else milliseconds * 99
+    report = {
+        'p50_ms': round(percentiles[49], 2),
+        'p95_ms': round(percentiles[94], 2),
+        'p99_ms': round(percentiles[98], 2),
+        'max_ms': round(max(milliseconds), 2),
+    }
+    if seconds:
+        report = {'requests_per_second': round(len(latencies) / seconds, 1), **report}
+    return report
@@ -0,0 +1,138 @@
+"""Concurrent throughput and tail latency: WSGI vs ASGI task API.
+
+Drives the project's real ``wsgi.application`` and ``asgi.application``
+in-process (no sockets) with ``--concurrency`` requests in flight, half of them
+task list pages and half task details, all token-authenticated:
+
+* ``wsgi``       - sync DRF views, one thread per in-flight request, as a
+                   threaded WSGI server would run them;
+* ``asgi-sync``  - the same sync views behind the ASGI handler, which runs each
+                   of them through the sync-to-async thread adapter;
+* ``asgi-async`` - the async views under /api/async/tasks/ on the async ORM.
+
+    python -m benchmarks.async_api --requests 2000 --concurrency 50
+"""
+import argparse
+import asyncio
+import io
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.util import setup_testing_defaults
+
+from benchmarks import latency_report, setup
+
+
+def paths(prefix, ids, count):
+    chosen = random.Random(0)
+    return [f'{prefix}?page_size=20' if number % 2 else f'{prefix}{chosen.choice(ids)}/' for number in range(count)]
+
+
+def split(path):
+    path, _, query = path.partition('?')
+    return path, query
+
+
+def wsgi_call(application, path, token):
+    path, query = split(path)
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query,
+        'SERVER_NAME': 'localhost', 'HTTP_HOST': 'localhost',
+        'HTTP_AUTHORIZATION': f'Token {token}', 'wsgi.input': io.BytesIO(),
+    }
+    setup_testing_defaults(environ)
+    statuses = []
+    started = time.perf_counter()
+    response = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    b''.join(response)
+    response.close()
+    return time.perf_counter() - started, int(statuses[0].split()[0])
+
+
+async def asgi_call(application, path, token):
+    path, query = split(path)
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+        'scheme': 'http', 'path': path, 'raw_path': path.encode(), 'query_string': query.encode(),
+        'root_path': '', 'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+        'headers': [(b'host', b'localhost'), (b'authorization', f'Token {token}'.encode())],
+    }
+    body = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+    statuses = []
+
+    async def receive():
+        if body:
+            return body.pop()
+        # The client stays connected until Django cancels the listener.
+        await asyncio.Future()
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            statuses.append(message['status'])
+
+    started = time.perf_counter()
+    await application(scope, receive, send)
+    return time.perf_counter() - started, statuses[0]
+
+
+def run_wsgi(application, requests, token, concurrency):
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(lambda path: wsgi_call(application, path, token), requests))
+
+
+def run_asgi(application, requests, token, concurrency):
+    async def bounded(slots, path):
+        async with slots:
+            return await asgi_call(application, path, token)
+
+    async def run():
+        slots = asyncio.Semaphore(concurrency)
+        return await asyncio.gather(*(bounded(slots, path) for path in requests))
+    return asyncio.run(run())
+
+
+def summarize(results, seconds):
+    report = latency_report([latency for latency, _ in results], seconds)
+    report['errors'] = sum(1 for _, status in results if status != 200)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--tasks', type=int, default=500)
+    args = parser.parse_args()
+
+    setup()
+    from django.contrib.auth.models import User
+    from rest_framework.authtoken.models import Token
+    from mainapp.models import TaskCard
+    from problem_book_site.asgi import application as asgi_application
+    from problem_book_site.wsgi import application as wsgi_application
+
+    user, _ = User.objects.get_or_create(username='bench-async')
+    token, _ = Token.objects.get_or_create(user=user)
+    TaskCard.objects.bulk_create([TaskCard(text=f'bench async {number}', creator=user) for number in range(args.tasks)])
+    ids = list(TaskCard.objects.filter(creator=user).values_list('id', flat=True))
+    modes = {
+        'wsgi': (run_wsgi, wsgi_application, '/api/tasks/'),
+        'asgi-sync': (run_asgi, asgi_application, '/api/tasks/'),
+        'asgi-async': (run_asgi, asgi_application, '/api/async/tasks/'),
+    }
+    report = {'requests': args.requests, 'concurrency': args.concurrency}
+    try:
+        for name, (run, application, prefix) in modes.items():
+            requests = paths(prefix, ids, args.requests)
+            run(application, requests[:args.concurrency], token.key, args.concurrency)
+            started = time.perf_counter()
+            results = run(application, requests, token.key, args.concurrency)
+            report[name] = summarize(results, time.perf_counter() - started)
+    finally:
+        TaskCard.objects.filter(creator=user).delete()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
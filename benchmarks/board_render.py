@@ -0,0 +1,96 @@
+"""CPU per card for rendering the /tasklist/ board.
+
+Renders a full board (``--cards`` per column, a mix of cards the viewer
+created, executes or only looks at) with:
+
+* ``legacy``     - the old tasks.html, five copied column loops with the
+                   permission checks and {% url %} calls inline, kept as a
+                   fixture (benchmarks/templates/tasks_legacy.html);
+* ``cold``       - tasks.html with the task_card.html component, every card
+                   fragment rendered;
+* ``warm``       - the same with the card fragments already cached.
+
+Board queries are not measured, only template rendering.
+
+    python -m benchmarks.board_render --cards 25 --repeat 50
+"""
+import argparse
+import json
+import time
+from functools import partial
+from pathlib import Path
+
+from benchmarks import setup
+
+
+LEGACY_TEMPLATE = Path(__file__).resolve().parent / 'templates' / 'tasks_legacy.html'
+
+
+def measure(render, repeat, cards, before=None):
+    spent = 0.0
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        started = time.process_time()
+        render()
+        spent += time.process_time() - started
+    return {'ms_per_page': round(spent / repeat * 1000, 2), 'us_per_card': round(spent / repeat / cards * 1e6, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--cards', type=int, default=25, help='cards per column')
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    setup()
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.core.cache import cache
+    from django.middleware.csrf import get_token
+    from django.template import engines
+    from django.template.loader import get_template
+    from django.test import RequestFactory
+    from mainapp.board import build_board, prepare_cards
+    from mainapp.models import TaskCard
+
+    viewer, _ = User.objects.get_or_create(username='bench-render')
+    other, _ = User.objects.get_or_create(username='bench-render-other')
+    TaskCard.objects.bulk_create([
+        TaskCard(text=f'bench render {status} {number}', status=status,
+                 creator=viewer if number % 3 == 0 else other,
+                 executor=viewer if number % 3 == 1 else None)
+        for status in TaskCard.STATUSES for number in range(args.cards)
+    ])
+    request = RequestFactory(SERVER_NAME='localhost').get('/tasklist/')
+    request.user = viewer
+    get_token(request)
+    try:
+        queryset = TaskCard.objects.filter(creator__in=[viewer, other])
+        columns = build_board(queryset, limit=args.cards)
+        cards = sum(len(column.cards) for column in columns)
+        legacy = engines['django'].from_string(LEGACY_TEMPLATE.read_text())
+        legacy_context = {'columns': columns, 'query': ''}
+        component = get_template('tasks.html')
+        component_context = {
+            'columns': prepare_cards(build_board(queryset, limit=args.cards), viewer), 'query': '',
+            'csrf_secret': request.META['CSRF_COOKIE'], 'card_cache_timeout': settings.BOARD_CARD_CACHE_TIMEOUT,
+        }
+        render_legacy = partial(legacy.render, legacy_context, request)
+        render_component = partial(component.render, component_context, request)
+        render_legacy(), render_component()
+        report = {
+            'cards': cards,
+            'legacy': measure(render_legacy, args.repeat, cards),
+            'cold': measure(render_component, args.repeat, cards, before=cache.clear),
+        }
+        render_component()
+        report['warm'] = measure(render_component, args.repeat, cards)
+    finally:
+        TaskCard.objects.filter(creator__in=[viewer, other]).delete()
+        User.objects.filter(pk__in=[viewer.pk, other.pk]).delete()
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
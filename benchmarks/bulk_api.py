@@ -0,0 +1,76 @@
+"""Single-item vs bulk throughput for /api/tasks/.
+
+Creates ``--items`` cards and moves each of them one status up, first with one
+token-authenticated request per item and then with a single
+``/api/tasks/bulk/`` request. The cards are removed afterwards.
+
+    python -m benchmarks.bulk_api --items 500
+"""
+import argparse
+import json
+import time
+
+from benchmarks import api_client, setup
+
+
+def create_single(client, count, user):
+    return [client.post('/api/tasks/', {'text': f'bench single {number}', 'creator': user.pk}, format='json').json()['id']
+            for number in range(count)]
+
+
+def move_single(client, ids):
+    for pk in ids:
+        client.patch(f'/api/tasks/{pk}/', {'status': 'In progress'}, format='json')
+
+
+def create_bulk(client, count, user):
+    response = client.post('/api/tasks/bulk/', [{'op': 'create', 'text': f'bench bulk {number}'} for number in range(count)], format='json')
+    return [result['id'] for result in response.json()['results']]
+
+
+def move_bulk(client, ids):
+    client.post('/api/tasks/bulk/', [{'op': 'transition', 'id': pk, 'status': 'In progress'} for pk in ids], format='json')
+
+
+MODES = {
+    'single': (create_single, move_single),
+    'bulk': (create_bulk, move_bulk),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=500)
+    args = parser.parse_args()
+
+    setup()
+    from django.contrib.auth.models import User
+    from rest_framework.authtoken.models import Token
+    from mainapp.bulk import MAX_BULK_ITEMS
+    from mainapp.models import TaskCard
+
+    user, _ = User.objects.get_or_create(username='bench-bulk')
+    token, _ = Token.objects.get_or_create(user=user)
+    client = api_client()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    count = min(args.items, MAX_BULK_ITEMS)
+    report = {'items': count}
+    try:
+        for name, (create, move) in MODES.items():
+            started = time.perf_counter()
+            ids = create(client, count, user)
+            seconds = time.perf_counter() - started
+            # Only the executor may move a card; assigning is not measured.
+            TaskCard.objects.filter(id__in=ids).update(executor=user)
+            started = time.perf_counter()
+            move(client, ids)
+            seconds += time.perf_counter() - started
+            report[name] = {'seconds': round(seconds, 3), 'operations_per_second': round(2 * count / seconds, 1)}
+    finally:
+        TaskCard.objects.filter(creator=user).delete()
+    report['speedup'] = round(report['single']['seconds'] / report['bulk']['seconds'], 1)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""Streaming export of millions of task cards.
+
+Seeds ``--rows`` cards with one INSERT ... SELECT, then streams them through
+/api/tasks/export/ as CSV and as NDJSON, reading the body chunk by chunk the
+way a client would. Reports rows/s and bytes, then the peak Python memory
+traced during a second export, which should not grow with ``--rows``. The
+seeded cards are removed afterwards.
+
+    python -m benchmarks.export --rows 2000000
+"""
+import argparse
+import json
+import time
+import tracemalloc
+
+from benchmarks import api_client, setup
+
+
+SERIES = {
+    'postgresql': 'FROM generate_series(1, %s) AS n',
+    'sqlite': 'FROM (WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < %s) SELECT n FROM seq)',
+}
+
+
+def seed(connection, rows, user):
+    now = 'now()' if connection.vendor == 'postgresql' else "datetime('now')"
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO mainapp_taskcard (text, create_at, update_at, status, creator_id, executor_id) '
+            f"SELECT 'exported card ' || n, {now}, {now}, n %% 5 + 1, %s, NULL {SERIES[connection.vendor]}",
+            [user.pk, rows],
+        )
+
+
+def export(client, output):
+    response = client.get('/api/tasks/export/', {'output': output})
+    return sum(len(chunk) for chunk in response.streaming_content)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2000000)
+    args = parser.parse_args()
+
+    setup()
+    from django.contrib.auth.models import User
+    from django.db import connection
+    from rest_framework.authtoken.models import Token
+
+    user, _ = User.objects.get_or_create(username='bench-export')
+    token, _ = Token.objects.get_or_create(user=user)
+    client = api_client()
+    client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    started = time.perf_counter()
+    seed(connection, args.rows, user)
+    report = {'rows': args.rows, 'seed_seconds': round(time.perf_counter() - started, 1)}
+    try:
+        for output in ('csv', 'ndjson'):
+            started = time.perf_counter()
+            size = export(client, output)
+            seconds = time.perf_counter() - started
+            # A second, traced pass: tracemalloc slows the export down.
+            tracemalloc.start()
+            export(client, output)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            report[output] = {
+                'seconds': round(seconds, 1),
+                'rows_per_second': round(args.rows / seconds),
+                'megabytes': round(size / 2 ** 20, 1),
+                'peak_traced_megabytes': round(peak / 2 ** 20, 1),
+            }
+    finally:
+        # A raw DELETE: the ORM would load every card to send post_delete.
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM mainapp_taskcard WHERE creator_id = %s', [user.pk])
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Synthetic users and task cards for the benchmarks.
+
+Creates ``--users`` users named ``seed-<n>`` (each with an API token) and
+``--cards`` task cards. The distributions follow a live board:
+
+* statuses: 30% New, 25% In progress, 15% In QA, 10% Ready, 20% Done;
+* most New cards are unassigned, every later card has an executor;
+* creators and executors are skewed: a few people own most of the work;
+* card text is drawn from a small vocabulary, so searches have hits.
+
+All cards are inserted with bulk_create, without per-card signals.
+``--clear`` removes everything a previous run created.
+
+    python -m benchmarks.seed --users 1000 --cards 200000
+"""
+import argparse
+import json
+import random
+import time
+from itertools import accumulate
+
+from benchmarks import setup
+
+
+PREFIX = 'seed-'
+STATUS_WEIGHTS = {'New': 30, 'In progress': 25, 'In QA': 15, 'Ready': 10, 'Done': 20}
+UNASSIGNED_NEW = 0.7
+VERBS = ('Fix', 'Add', 'Review', 'Refactor', 'Document', 'Deploy', 'Test', 'Investigate')
+NOUNS = ('login form', 'billing report', 'search index', 'export job', 'mobile layout',
+         'payment webhook', 'user profile', 'email digest', 'board filters', 'audit log')
+BATCH_SIZE = 5000
+
+
+def generate_cards(count, users, chosen):
+    statuses = list(STATUS_WEIGHTS)
+    weights = list(STATUS_WEIGHTS.values())
+    # Zipf: the n-th user gets 1/n of the first user's cards.
+    user_weights = list(accumulate(1 / rank for rank in range(1, len(users) + 1)))
+    for number in range(count):
+        status = chosen.choices(statuses, weights)[0]
+        creator, executor = chosen.choices(users, cum_weights=user_weights, k=2)
+        if status == 'New' and chosen.random() < UNASSIGNED_NEW:
+            executor = None
+        yield {
+            'text': f'{chosen.choice(VERBS)} {chosen.choice(NOUNS)} #{number}',
+            'status': status,
+            'creator_id': creator,
+            'executor_id': executor,
+        }
+
+
+def clear():
+    from django.contrib.auth.models import User
+    from django.db import connection
+
+    seeded = User.objects.filter(username__startswith=PREFIX)
+    # A raw DELETE: the ORM would load every card to send post_delete.
+    with connection.cursor() as cursor:
+        users = 'SELECT id FROM auth_user WHERE username LIKE %s'
+        cursor.execute(f'DELETE FROM mainapp_taskcard WHERE creator_id IN ({users}) OR executor_id IN ({users})',
+                       [f'{PREFIX}%', f'{PREFIX}%'])
+    return seeded.delete()[1].get('auth.User', 0)
+
+
+def seed(users, cards, random_seed=0):
+    from django.contrib.auth.models import User
+    from rest_framework.authtoken.models import Token
+    from mainapp.models import TaskCard
+
+    chosen = random.Random(random_seed)
+    start = User.objects.filter(username__startswith=PREFIX).count()
+    User.objects.bulk_create([User(username=f'{PREFIX}{start + number}', password='!') for number in range(users)])
+    created = list(User.objects.filter(username__startswith=PREFIX).order_by('id'))
+    with_token = set(Token.objects.filter(user__in=created).values_list('user_id', flat=True))
+    Token.objects.bulk_create([Token(key=Token.generate_key(), user=user) for user in created if user.id not in with_token])
+    user_ids = [user.id for user in created]
+    batch = []
+    for card in generate_cards(cards, user_ids, chosen):
+        batch.append(TaskCard(**card))
+        if len(batch) == BATCH_SIZE:
+            TaskCard.objects.bulk_create(batch)
+            batch = []
+    TaskCard.objects.bulk_create(batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--cards', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=0, help='random seed')
+    parser.add_argument('--clear', action='store_true', help='only remove previously seeded data')
+    args = parser.parse_args()
+
+    setup()
+    started = time.perf_counter()
+    if args.clear:
+        print(json.dumps({'removed_users': clear()}))
+        return
+    seed(args.users, args.cards, args.seed)
+    print(json.dumps({'users': args.users, 'cards': args.cards, 'seconds': round(time.perf_counter() - started, 1)}))
+
+
+if __name__ == '__main__':
+    main()
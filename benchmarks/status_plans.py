@@ -0,0 +1,152 @@
+"""Before/after query plans for the TaskCard status column.
+
+Builds two scratch tables next to the real schema: ``bench_status_text`` with
+the old unindexed text status and ``bench_status_code`` with the small-integer
+status and the composite indexes of ``TaskCard.Meta``. Both get the same
+seeded rows, and ``bench_status_user`` stands in for auth_user. The board
+query is the statement ``build_board()`` sends, moved onto the scratch tables;
+it and the executor, creator and status-search queries are explained and
+timed on each.
+
+    python -m benchmarks.status_plans --rows 1000000
+"""
+import argparse
+import json
+import time
+
+from benchmarks import setup
+
+
+STATUS_LABELS = ('New', 'In progress', 'In QA', 'Ready', 'Done')
+
+# Roughly what a live board looks like: a lot of new and finished work.
+STATUS_BY_BUCKET = 'CASE WHEN n %% 20 < 6 THEN {0} WHEN n %% 20 < 11 THEN {1} WHEN n %% 20 < 14 THEN {2} WHEN n %% 20 < 16 THEN {3} ELSE {4} END'
+
+
+def status_expression(text):
+    if text:
+        return STATUS_BY_BUCKET.format(*(f"'{label}'" for label in STATUS_LABELS))
+    return STATUS_BY_BUCKET.format(1, 2, 3, 4, 5)
+
+
+def create_tables(cursor, vendor, rows, users):
+    series = {
+        'postgresql': 'FROM generate_series(1, %s) AS n',
+        'sqlite': 'FROM (WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < %s) SELECT n FROM seq)',
+    }[vendor]
+    now = 'now()' if vendor == 'postgresql' else "datetime('now')"
+    update_at = (f"{now} - (n %% 2592000) * interval '1 second'" if vendor == 'postgresql'
+                 else "datetime('now', '-' || (n %% 2592000) || ' seconds')")
+    for table, text, status_type in (('bench_status_text', True, 'text'), ('bench_status_code', False, 'smallint')):
+        cursor.execute(f'DROP TABLE IF EXISTS {table}')
+        cursor.execute(
+            f'CREATE TABLE {table} (id integer PRIMARY KEY, text text, create_at timestamp, update_at timestamp, '
+            f'status {status_type} NOT NULL, creator_id integer NOT NULL, executor_id integer)'
+        )
+        cursor.execute(
+            f'INSERT INTO {table} (id, text, create_at, update_at, status, creator_id, executor_id) '
+            f"SELECT n, 'card ' || n, {update_at}, {update_at}, {status_expression(text)}, "
+            f'(n * 104729) %% %s + 1, CASE WHEN n %% 5 = 0 THEN NULL ELSE (n * 7919) %% %s + 1 END {series}',
+            [users, users, rows],
+        )
+    cursor.execute('DROP TABLE IF EXISTS bench_status_user')
+    cursor.execute('CREATE TABLE bench_status_user AS SELECT * FROM auth_user WHERE 1 = 0')
+    cursor.execute('CREATE UNIQUE INDEX bench_status_user_id ON bench_status_user (id)')
+    cursor.execute(
+        'INSERT INTO bench_status_user (id, password, is_superuser, username, first_name, last_name, email, '
+        f"is_staff, is_active, date_joined) SELECT n, '', false, 'user' || n, '', '', '', false, true, {now} {series}",
+        [users],
+    )
+    cursor.execute('CREATE INDEX bench_status_text_creator ON bench_status_text (creator_id)')
+    cursor.execute('CREATE INDEX bench_status_text_executor ON bench_status_text (executor_id)')
+    cursor.execute('CREATE INDEX bench_status_code_status_update ON bench_status_code (status, update_at)')
+    cursor.execute('CREATE INDEX bench_status_code_executor_status ON bench_status_code (executor_id, status)')
+    cursor.execute('CREATE INDEX bench_status_code_creator_status ON bench_status_code (creator_id, status)')
+    cursor.execute('ANALYZE bench_status_text' if vendor == 'postgresql' else 'ANALYZE')
+    if vendor == 'postgresql':
+        cursor.execute('ANALYZE bench_status_code')
+        cursor.execute('ANALYZE bench_status_user')
+
+
+def board_query(table, text):
+    from mainapp.board import COLUMN_LIMIT, board_rows
+    from mainapp.models import STATUS_CODES, TaskCard
+
+    sql, params = board_rows(TaskCard.objects.all(), {}, COLUMN_LIMIT).query.sql_with_params()
+    sql = sql.replace('"mainapp_taskcard"', f'"{table}"').replace('"auth_user"', '"bench_status_user"')
+    if text:
+        labels = {code: label for label, code in STATUS_CODES.items()}
+        params = [labels[param] if chunk.endswith('"status" = ') else param
+                  for chunk, param in zip(sql.split('%s'), params)]
+    return sql, params
+
+
+def scenarios(users):
+    user = users // 2
+    return {
+        'board': (board_query('bench_status_text', True), board_query('bench_status_code', False)),
+        'executor_open_cards': (
+            f"SELECT id FROM bench_status_text WHERE executor_id = {user} AND status = 'In progress'",
+            f'SELECT id FROM bench_status_code WHERE executor_id = {user} AND status = 2',
+        ),
+        'creator_done_cards': (
+            f"SELECT id FROM bench_status_text WHERE creator_id = {user} AND status = 'Done'",
+            f'SELECT id FROM bench_status_code WHERE creator_id = {user} AND status = 5',
+        ),
+        'status_search': (
+            "SELECT count(*) FROM bench_status_text WHERE UPPER(status) LIKE UPPER('%ready%')",
+            'SELECT count(*) FROM bench_status_code WHERE status IN (4)',
+        ),
+    }
+
+
+def explain(cursor, vendor, statement, repeat):
+    sql, params = statement if isinstance(statement, tuple) else (statement, None)
+    if vendor == 'postgresql':
+        cursor.execute(f'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+        plan = plan if isinstance(plan, list) else json.loads(plan)
+    else:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        plan = [row[-1] for row in cursor.fetchall()]
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        cursor.execute(sql, params)
+        cursor.fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {'plan': plan, 'best_ms': round(timings[0], 3), 'median_ms': round(timings[len(timings) // 2], 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=5_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--keep', action='store_true', help='keep the scratch tables')
+    args = parser.parse_args()
+
+    setup()
+    from django.db import connection
+
+    vendor = connection.vendor
+    report = {'vendor': vendor, 'rows': args.rows, 'scenarios': {}}
+    with connection.cursor() as cursor:
+        started = time.perf_counter()
+        create_tables(cursor, vendor, args.rows, args.users)
+        report['seed_seconds'] = round(time.perf_counter() - started, 2)
+        for name, (before, after) in scenarios(args.users).items():
+            report['scenarios'][name] = {
+                'before': explain(cursor, vendor, before, args.repeat),
+                'after': explain(cursor, vendor, after, args.repeat),
+            }
+        if not args.keep:
+            cursor.execute('DROP TABLE bench_status_text')
+            cursor.execute('DROP TABLE bench_status_code')
+            cursor.execute('DROP TABLE bench_status_user')
+    print(json.dumps(report, indent=2, default=str))
+
+
+if __name__ == '__main__':
+    main()
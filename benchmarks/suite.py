@@ -0,0 +1,177 @@
+"""Baseline load test over the seeded data set.
+
+Runs every scenario against the data created by ``benchmarks.seed`` through
+Django's test clients (no sockets) and reports, per scenario, requests/s,
+p50/p95/p99 latency, errors and database queries per request as JSON:
+
+* ``tasklist``      - GET /tasklist/ (repeat views are served by the board cache)
+* ``task_detail``   - GET /task/<pk>/
+* ``api_list``      - GET /api/tasks/
+* ``api_search``    - GET /api/tasks/?q=<word>
+* ``api_update``    - PATCH /api/tasks/<pk>/ with new text
+* ``upper_status``  - POST /tasks/<pk>/upper-status/ (In progress -> In QA)
+* ``lower_status``  - POST /tasks/<pk>/lower-status/ (moves them back)
+* ``token_auth``    - GET /api/tasks/<pk>/ with a different user's token each time
+
+The viewer is the busiest seeded executor. ``--baseline`` compares with the
+JSON of an earlier run, so releases can be held against each other.
+
+    python -m benchmarks.seed --users 1000 --cards 200000
+    python -m benchmarks.suite --requests 500 --output baseline.json
+    python -m benchmarks.suite --requests 500 --baseline baseline.json
+"""
+import argparse
+import json
+import random
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from benchmarks import api_client, latency_report, setup
+from benchmarks.seed import NOUNS, PREFIX
+
+
+def build_scenarios(requests, chosen):
+    from django.contrib.auth.models import User
+    from django.db.models import Count
+    from django.urls import reverse
+    from rest_framework.authtoken.models import Token
+    from mainapp.models import TaskCard
+
+    seeded = TaskCard.objects.filter(creator__username__startswith=PREFIX)
+    viewer = (User.objects.filter(username__startswith=PREFIX)
+              .annotate(cards=Count('user_executor')).order_by('-cards').first())
+    if viewer is None:
+        raise SystemExit('Nothing seeded yet: run python -m benchmarks.seed first.')
+    ids = list(seeded.values_list('id', flat=True)[:10000])
+    own = list(seeded.filter(creator=viewer).values_list('id', flat=True)[:requests])
+    moving = list(seeded.filter(executor=viewer, status='In progress').values_list('id', flat=True)[:requests])
+    tokens = list(Token.objects.filter(user__username__startswith=PREFIX).values_list('key', flat=True))
+
+    def sample(population):
+        return [chosen.choice(population) for _ in range(requests)] if population else []
+
+    scenarios = {
+        'tasklist': [('session', 'get', reverse('tasks'), None, {})] * requests,
+        'task_detail': [('session', 'get', reverse('task_detail', kwargs={'pk': pk}), None, {}) for pk in sample(ids)],
+        'api_list': [('api', 'get', '/api/tasks/', None, {})] * requests,
+        'api_search': [('api', 'get', '/api/tasks/', {'q': chosen.choice(NOUNS).split()[0]}, {}) for _ in range(requests)],
+        'api_update': [('api', 'patch', f'/api/tasks/{pk}/', {'text': f'Benchmarked {number}'}, {})
+                       for number, pk in enumerate(sample(own))],
+        'upper_status': [('session', 'post', reverse('upper_task_status', kwargs={'pk': pk}), {'status': 'In progress'}, {})
+                         for pk in moving],
+        'lower_status': [('session', 'post', reverse('lower_task_status', kwargs={'pk': pk}), {'status': 'In QA'}, {})
+                         for pk in moving],
+        'token_auth': [('anonymous', 'get', f'/api/tasks/{pk}/', None, {'HTTP_AUTHORIZATION': f'Token {key}'})
+                       for pk, key in zip(sample(ids), sample(tokens))],
+    }
+    return viewer, scenarios
+
+
+def make_clients(viewer):
+    from django.test import Client
+    from rest_framework.authtoken.models import Token
+
+    session = Client(SERVER_NAME='localhost')
+    session.force_login(viewer)
+    api = api_client()
+    api.credentials(HTTP_AUTHORIZATION=f'Token {Token.objects.get(user=viewer).key}')
+    return {'session': session, 'api': api, 'anonymous': api_client()}
+
+
+def run_scenario(calls, viewer, concurrency):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    local = threading.local()
+
+    def call(spec):
+        if not hasattr(local, 'clients'):
+            local.clients = make_clients(viewer)
+        client_name, method, path, data, extra = spec
+        client = local.clients[client_name]
+        kwargs = {'format': 'json'} if client_name != 'session' and method != 'get' else {}
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = getattr(client, method)(path, data, **kwargs, **extra)
+            latency = time.perf_counter() - started
+        return latency, response.status_code, len(queries)
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(call, calls))
+    else:
+        results = [call(spec) for spec in calls]
+    seconds = time.perf_counter() - started
+    report = {'requests': len(results)}
+    report.update(latency_report([latency for latency, _, _ in results], seconds))
+    report['errors'] = sum(1 for _, status, _ in results if status >= 400)
+    report['queries_per_request'] = round(sum(count for _, _, count in results) / len(results), 2)
+    report['max_queries'] = max(count for _, _, count in results)
+    return report
+
+
+def compare(report, baseline):
+    changes = {}
+    for name, current in report['scenarios'].items():
+        previous = baseline.get('scenarios', {}).get(name)
+        if previous:
+            changes[name] = {
+                'requests_per_second': f"{current['requests_per_second'] / previous['requests_per_second'] - 1:+.1%}",
+                'p95_ms': f"{current['p95_ms'] - previous['p95_ms']:+.2f}",
+                'queries_per_request': f"{current['queries_per_request'] - previous['queries_per_request']:+.2f}",
+            }
+    return changes
+
+
+def revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=Path(__file__).resolve().parent,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=500, help='requests per scenario')
+    parser.add_argument('--concurrency', type=int, default=1, help='client threads')
+    parser.add_argument('--scenario', action='append', help='run only these scenarios')
+    parser.add_argument('--output', help='also write the report here')
+    parser.add_argument('--baseline', help='report from an earlier run to compare with')
+    args = parser.parse_args()
+
+    setup()
+    from django.db import connection
+    from django.test.utils import override_settings
+
+    # Measured latencies should not include writing the slow-query log, and
+    # the log should not land wherever the settings point it.
+    override_settings(SLOW_QUERY_ENABLED=False, TRAFFIC_CAPTURE_ENABLED=False).enable()
+    viewer, scenarios = build_scenarios(args.requests, random.Random(0))
+    report = {
+        'revision': revision(),
+        'database': connection.vendor,
+        'viewer': viewer.username,
+        'concurrency': args.concurrency,
+        'scenarios': {},
+    }
+    for name, calls in scenarios.items():
+        if calls and (not args.scenario or name in args.scenario):
+            if name not in ('upper_status', 'lower_status'):
+                # Warm caches and connections; status moves only work once.
+                run_scenario(calls[:5], viewer, 1)
+            report['scenarios'][name] = run_scenario(calls, viewer, args.concurrency)
+    if args.baseline:
+        report['change'] = compare(report, json.loads(Path(args.baseline).read_text()))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + '\n')
+    print(output)
+
+
+if __name__ == '__main__':
+    main()
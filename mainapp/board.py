@@ -0,0 +1,101 @@
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+from django.urls import reverse
+from django.utils.text import slugify
+from .models import TaskCard
+
+
+COLUMN_LIMIT = 25
+
+# Who sees a card's (upper, lower) move buttons, per column.
+MOVE_BUTTONS = {
+    'New': (('executor',), ()),
+    'In progress': (('executor',), ('executor',)),
+    'In QA': (('executor',), ('executor',)),
+    'Ready': (('superuser',), ('executor',)),
+    'Done': ((), ('superuser', 'executor')),
+}
+CARD_URL_NAMES = ('task_detail', 'task_update', 'task_delete', 'set_executor', 'upper_task_status', 'lower_task_status')
+
+
+class BoardColumn:
+    def __init__(self, status):
+        self.status = status
+        self.cursor_param = f'after_{slugify(status)}'
+        self.cards = []
+        self.has_more = False
+        self.next_cursor = None
+        self.next_url = None
+
+
+class BoardCard:
+    def __init__(self, task, user, urls):
+        roles = {
+            'superuser': user.is_superuser,
+            'creator': task.creator_id == user.pk,
+            'executor': task.executor_id is not None and task.executor_id == user.pk,
+        }
+        upper, lower = MOVE_BUTTONS[task.status]
+        self.task = task
+        self.can_manage = roles['superuser'] or roles['creator']
+        self.can_move_upper = any(roles[role] for role in upper)
+        self.can_move_lower = any(roles[role] for role in lower)
+        self.urls = {name: url.format(pk=task.pk) for name, url in urls.items()}
+        # Everything the card fragment depends on apart from the viewer's CSRF
+        # secret; an edit moves update_at, a user renamed without save() does not.
+        self.version = (task.pk, task.update_at.timestamp(), self.can_manage, self.can_move_upper, self.can_move_lower,
+                        task.creator.username, task.executor.username if task.executor_id else None)
+
+
+def card_urls():
+    # Reversed once per page instead of once per card and button.
+    return {name: reverse(name, kwargs={'pk': 0}).replace('/0/', '/{pk}/', 1) for name in CARD_URL_NAMES}
+
+
+def prepare_cards(columns, user):
+    urls = card_urls()
+    for column in columns:
+        column.cards = [BoardCard(task, user, urls) for task in column.cards]
+    return columns
+
+
+def parse_cursors(params):
+    cursors = {}
+    for status in TaskCard.STATUSES:
+        value = params.get(f'after_{slugify(status)}')
+        # Anything else is ignored; 18 digits stay within a bigint.
+        if value and value.isascii() and value.isdigit() and len(value) <= 18:
+            cursors[status] = int(value)
+    return cursors
+
+
+def board_rows(queryset, cursors, limit):
+    condition = Q()
+    for status in TaskCard.STATUSES:
+        if status in cursors:
+            condition |= Q(status=status, id__gt=cursors[status])
+        else:
+            condition |= Q(status=status)
+    # One round trip for the whole board: every column is cut to limit + 1
+    # rows by the database, the extra row only tells us there is more.
+    return (queryset.filter(condition)
+            .select_related('creator', 'executor')
+            .annotate(column_position=Window(RowNumber(), partition_by=F('status'), order_by=F('id').asc()))
+            .filter(column_position__lte=limit + 1)
+            .order_by('status', 'id'))
+
+
+def build_board(queryset=None, cursors=None, limit=COLUMN_LIMIT):
+    if queryset is None:
+        queryset = TaskCard.objects.all()
+    columns = {status: BoardColumn(status) for status in TaskCard.STATUSES}
+    for task in board_rows(queryset, cursors or {}, limit):
+        column = columns[task.status]
+        if len(column.cards) < limit:
+            column.cards.append(task)
+        else:
+            column.has_more = True
+    for column in columns.values():
+        if column.has_more:
+            column.next_cursor = column.cards[-1].id
+    return list(columns.values())
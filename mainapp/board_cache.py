@@ -0,0 +1,65 @@
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .models import TaskCard
+from .signals import may_rename, task_cards_changed
+
+
+class BoardCache:
+    def __init__(self, max_entries=256, timeout=60):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key, content):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.timeout, content)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries)}
+
+
+board_cache = BoardCache(settings.BOARD_CACHE_MAX_ENTRIES, settings.BOARD_CACHE_TIMEOUT)
+
+
+# Entries are keyed by the page ETag, which is derived from the task table
+# itself, so a change made by another process simply stops matching. Clearing
+# on local writes only frees memory early.
+@receiver(post_save, sender=TaskCard)
+@receiver(post_delete, sender=TaskCard)
+@receiver(task_cards_changed)
+def invalidate_board(sender, **kwargs):
+    board_cache.clear()
+
+
+@receiver(post_save, sender=User)
+def invalidate_renamed_user(sender, created, update_fields=None, **kwargs):
+    if may_rename(created, update_fields):
+        board_cache.clear()
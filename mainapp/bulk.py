@@ -0,0 +1,99 @@
+from collections import defaultdict
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+from .models import TaskCard
+from .serializers import TaskCardSerializer
+from .signals import card_event, notify
+
+
+MAX_BULK_ITEMS = 500
+
+OPERATION_FIELDS = {
+    'create': ('text',),
+    'update': ('text',),
+    'assign': ('executor',),
+    'transition': ('status',),
+}
+
+
+def _is_id(value):
+    # bool is an int subclass: "id": true must not mean pk 1.
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _item_error(index, item, errors):
+    return {'index': index, 'op': item.get('op') if isinstance(item, dict) else None, 'errors': errors}
+
+
+def apply_bulk(items, request):
+    if not isinstance(items, list):
+        raise serializers.ValidationError("Expected a list of operations")
+    if len(items) > MAX_BULK_ITEMS:
+        raise serializers.ValidationError(f"At most {MAX_BULK_ITEMS} operations per request")
+    context = {'request': request}
+    ids = {item['id'] for item in items if isinstance(item, dict) and _is_id(item.get('id'))}
+    with transaction.atomic():
+        # The rows stay locked until commit, so the statuses validated below
+        # are the ones bulk_update overwrites.
+        tasks = TaskCard.objects.select_for_update().in_bulk(ids)
+        errors = []
+        created = []
+        changed = defaultdict(set)
+        for index, item in enumerate(items):
+            if not isinstance(item, dict) or item.get('op') not in OPERATION_FIELDS:
+                errors.append(_item_error(index, item, {'op': [f"Expected one of: {', '.join(OPERATION_FIELDS)}"]}))
+                continue
+            data = {field: item[field] for field in OPERATION_FIELDS[item['op']] if field in item}
+            if item['op'] == 'create':
+                # Partial, as the creator is the caller; text is still required.
+                serializer = TaskCardSerializer(data=data, partial=True, context=context)
+                if not serializer.is_valid():
+                    errors.append(_item_error(index, item, serializer.errors))
+                    continue
+                if 'text' not in serializer.validated_data:
+                    errors.append(_item_error(index, item, {'text': [serializer.fields['text'].error_messages['required']]}))
+                    continue
+                created.append((index, TaskCard(text=serializer.validated_data['text'], creator=request.user)))
+                continue
+            task = tasks.get(item['id']) if _is_id(item.get('id')) else None
+            if task is None:
+                errors.append(_item_error(index, item, {'id': ["No such task"]}))
+                continue
+            serializer = TaskCardSerializer(task, data=data, partial=True, context=context)
+            if not serializer.is_valid():
+                errors.append(_item_error(index, item, serializer.errors))
+                continue
+            try:
+                update_fields, new_status = serializer.apply_changes(task, serializer.validated_data)
+            except serializers.ValidationError as exc:
+                errors.append(_item_error(index, item, exc.detail))
+                continue
+            if new_status is not None:
+                task.status = new_status
+                update_fields.append('status')
+            changed[task.pk].update(update_fields)
+        if errors:
+            transaction.set_rollback(True)
+            return False, errors
+
+        TaskCard.objects.bulk_create([task for _, task in created])
+        now = timezone.now()
+        groups = defaultdict(list)
+        for pk, fields in changed.items():
+            if fields:
+                tasks[pk].update_at = now
+                groups[frozenset(fields)].append(tasks[pk])
+        for fields, group in groups.items():
+            TaskCard.objects.bulk_update(group, [*fields, 'update_at'])
+        notify([card_event('create', task) for _, task in created]
+               + [card_event(kind, tasks[pk]) for pk, fields in changed.items()
+                  for field, kind in (('text', 'update'), ('status', 'status'), ('executor', 'executor')) if field in fields])
+
+    results = [None] * len(items)
+    for index, task in created:
+        results[index] = {'index': index, 'op': 'create', 'id': task.pk}
+    for index, item in enumerate(items):
+        if results[index] is None:
+            results[index] = {'index': index, 'op': item['op'], 'id': item['id']}
+    return True, results
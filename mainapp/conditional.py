@@ -0,0 +1,57 @@
+import hashlib
+from django.contrib import messages
+from django.db.models import Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from .models import TaskCardTombstone
+
+
+def _with_deletion(state, deletion):
+    if deletion is not None:
+        state['last_deletion'] = deletion['id']
+        if state['last_update'] is None or deletion['deleted_at'] > state['last_update']:
+            state['last_update'] = deletion['deleted_at']
+    return state
+
+
+def list_state(queryset):
+    # max(update_at) moves on every edit, max(id) on every insert and the
+    # newest tombstone on every delete; all three are index lookups, unlike a
+    # COUNT(*) over the table. A card edited out of a filtered list moves
+    # nothing inside the filter, so filtered lists add the table-wide
+    # max(update_at) as well.
+    state = queryset.order_by().aggregate(last_update=Max('update_at'), last_id=Max('id'))
+    if queryset.query.has_filters():
+        state['table_update'] = queryset.model.objects.aggregate(last_update=Max('update_at'))['last_update']
+    return _with_deletion(state, TaskCardTombstone.objects.order_by('-id').values('id', 'deleted_at').first())
+
+
+async def alist_state(queryset):
+    state = await queryset.order_by().aaggregate(last_update=Max('update_at'), last_id=Max('id'))
+    if queryset.query.has_filters():
+        state['table_update'] = (await queryset.model.objects.aaggregate(last_update=Max('update_at')))['last_update']
+    return _with_deletion(state, await TaskCardTombstone.objects.order_by('-id').values('id', 'deleted_at').afirst())
+
+
+def make_etag(request, *parts):
+    user = request.user
+    parts = (request.get_full_path(), user.pk, user.is_superuser, *parts)
+    return quote_etag(hashlib.md5('|'.join(map(str, parts)).encode()).hexdigest())
+
+
+def set_validators(response, etag, last_modified=None):
+    response.headers['ETag'] = etag
+    if last_modified is not None:
+        response.headers['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
+
+
+def not_modified(request, etag, last_modified=None, check_messages=True):
+    # Decided on the ETag alone: Last-Modified has one second resolution, so
+    # If-Modified-Since could miss a change made within the same second.
+    if request.method not in ('GET', 'HEAD') or (check_messages and len(messages.get_messages(request))):
+        return None
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        set_validators(response, etag, last_modified)
+    return response
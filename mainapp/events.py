@@ -0,0 +1,110 @@
+import asyncio
+import json
+import threading
+from django.dispatch import receiver
+from .signals import task_cards_changed
+
+
+class Subscription:
+    def __init__(self, user_id, queue_size):
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.closed = False
+
+    def put(self, events):
+        # Runs on the subscriber's event loop. A client that cannot keep up
+        # loses its backlog and is told to reload instead of growing memory.
+        if self.closed:
+            return
+        if self.queue.full():
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait([{'type': 'resync'}])
+        else:
+            self.queue.put_nowait(events)
+
+    def close(self):
+        # Runs on the subscriber's event loop; the stream ends on its next read.
+        self.closed = True
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+
+class BroadcastHub:
+    def __init__(self, queue_size=100, max_connections_per_user=3):
+        self.queue_size = queue_size
+        self.max_connections_per_user = max_connections_per_user
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+
+    def subscribe(self, user_id):
+        # ASGI servers do not tell Django 4.2 when a stream's client has gone,
+        # so a user over the cap is not refused: their oldest stream is closed,
+        # whether or not anyone is still reading it.
+        subscription = Subscription(user_id, self.queue_size)
+        with self._lock:
+            streams = [other for other in self._subscriptions if other.user_id == user_id]
+            for other in streams[:len(streams) - self.max_connections_per_user + 1]:
+                del self._subscriptions[other]
+                self._close(other)
+            self._subscriptions[subscription] = None
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.pop(subscription, None)
+
+    def connections(self, user_id):
+        with self._lock:
+            return sum(subscription.user_id == user_id for subscription in self._subscriptions)
+
+    def _close(self, subscription):
+        try:
+            subscription.loop.call_soon_threadsafe(subscription.close)
+        except RuntimeError:
+            pass
+
+    def publish(self, events):
+        with self._lock:
+            subscriptions = list(self._subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, events)
+            except RuntimeError:
+                self.unsubscribe(subscription)
+
+
+hub = BroadcastHub()
+
+
+@receiver(task_cards_changed)
+def broadcast(sender, events, **kwargs):
+    hub.publish(events)
+
+
+async def event_stream(subscription, heartbeat=15, max_age=None):
+    # Ends after max_age seconds (EventSource reconnects on its own), so a
+    # stream whose client vanished is released within max_age at the latest.
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + max_age if max_age else None
+    try:
+        yield 'retry: 3000\n\n'
+        while True:
+            timeout = heartbeat if deadline is None else min(heartbeat, deadline - loop.time())
+            if timeout <= 0:
+                return
+            try:
+                events = await asyncio.wait_for(subscription.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                if deadline is not None and loop.time() >= deadline:
+                    return
+                yield ': keep-alive\n\n'
+                continue
+            if events is None:
+                return
+            for event in events:
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    finally:
+        hub.unsubscribe(subscription)
@@ -0,0 +1,72 @@
+import csv
+import json
+from itertools import islice
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from .models import TaskCard
+
+
+EXPORT_FIELDS = ('id', 'text', 'status', 'creator', 'executor', 'create_at', 'update_at')
+CHUNK_SIZE = 2000
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+class _Line:
+    # csv.writer only needs something with write(); hand the line back.
+    def write(self, value):
+        return value
+
+
+def filter_export(queryset, status=None, executor=None, created_after=None, created_before=None):
+    if status is not None:
+        queryset = queryset.filter(status=status)
+    if executor is not None:
+        queryset = queryset.filter(executor_id=executor)
+    if created_after is not None:
+        queryset = queryset.filter(create_at__gte=created_after)
+    if created_before is not None:
+        queryset = queryset.filter(create_at__lt=created_before)
+    return queryset
+
+
+def export_rows(queryset, chunk_size=CHUNK_SIZE):
+    # values_list + iterator(): plain tuples, fetched chunk_size at a time
+    # (a server-side cursor on PostgreSQL), never the whole result set.
+    columns = [f'{field}_id' if field in ('creator', 'executor') else field for field in EXPORT_FIELDS]
+    return queryset.order_by('id').values_list(*columns).iterator(chunk_size=chunk_size)
+
+
+def _csv_lines(rows):
+    writer = csv.writer(_Line())
+    yield writer.writerow(EXPORT_FIELDS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _ndjson_lines(rows):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(dict(zip(EXPORT_FIELDS, row))) + '\n'
+
+
+def export_chunks(queryset=None, output='csv', chunk_size=CHUNK_SIZE):
+    if queryset is None:
+        queryset = TaskCard.objects.all()
+    lines = (_csv_lines if output == 'csv' else _ndjson_lines)(export_rows(queryset, chunk_size))
+    while True:
+        chunk = ''.join(islice(lines, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+async def aexport_chunks(chunks):
+    # Under ASGI a sync iterator would be read into memory before sending;
+    # each chunk is instead pulled on the request's sync thread, where the
+    # database cursor lives.
+    pull = sync_to_async(lambda: next(chunks, None))
+    while (chunk := await pull()) is not None:
+        yield chunk
@@ -0,0 +1,13 @@
+from rest_framework.filters import SearchFilter
+from .models import TaskCard
+
+
+
+class StatusSearchFilter(SearchFilter):
+    # Status is stored as a small integer, so the case-insensitive "contains"
+    # match is resolved against the labels here and sent as an indexed IN.
+    def filter_queryset(self, request, queryset, view):
+        for term in self.get_search_terms(request):
+            labels = [label for label in TaskCard.STATUSES if term.lower() in label.lower()]
+            queryset = queryset.filter(status__in=labels)
+        return queryset
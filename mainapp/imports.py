@@ -0,0 +1,106 @@
+import csv
+import io
+import json
+import os
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import STATUS_CODES, TaskCard
+
+
+BATCH_SIZE = 5000
+COPY_SQL = ('COPY mainapp_taskcard (text, status, creator_id, executor_id, create_at, update_at) '
+            'FROM STDIN WITH (FORMAT csv)')
+
+
+class ImportRecordError(ValueError):
+    def __init__(self, number, message):
+        super().__init__(f'record {number}: {message}')
+
+
+def read_records(stream, input_format):
+    if input_format == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        if line.strip():
+            yield line
+
+
+def parse_record(number, record, users):
+    # (text, status label, creator id, executor id); usernames are looked up
+    # in the preloaded users map, never one query per row.
+    if isinstance(record, str):
+        try:
+            record = json.loads(record)
+        except ValueError:
+            raise ImportRecordError(number, 'invalid JSON')
+    if not isinstance(record, dict):
+        raise ImportRecordError(number, 'expected an object')
+    status = record.get('status') or 'New'
+    if status not in STATUS_CODES:
+        raise ImportRecordError(number, f'unknown status {status!r}')
+    creator = users.get(record.get('creator'))
+    if creator is None:
+        raise ImportRecordError(number, f"unknown creator {record.get('creator')!r}")
+    executor = None
+    if record.get('executor'):
+        executor = users.get(record['executor'])
+        if executor is None:
+            raise ImportRecordError(number, f"unknown executor {record['executor']!r}")
+    return record.get('text'), status, creator, executor
+
+
+def _copy_field(value):
+    # COPY ... CSV reads an unquoted empty field as NULL and a quoted one as
+    # an empty string, so every value is quoted and None is left empty.
+    if value is None:
+        return ''
+    return '"{}"'.format(str(value).replace('"', '""'))
+
+
+def copy_csv(rows, now):
+    return ''.join(
+        ','.join(map(_copy_field, (text, STATUS_CODES[status], creator, executor, now, now))) + '\n'
+        for text, status, creator, executor in rows
+    )
+
+
+def _copy(rows, now):
+    buffer = io.StringIO(copy_csv(rows, now))
+    with connection.cursor() as cursor:
+        raw = cursor.cursor
+        if hasattr(raw, 'copy_expert'):
+            raw.copy_expert(COPY_SQL, buffer)
+        else:
+            with raw.copy(COPY_SQL) as copy:
+                copy.write(buffer.getvalue())
+
+
+def insert_batch(rows):
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            _copy(rows, timezone.now().isoformat())
+        else:
+            TaskCard.objects.bulk_create(
+                [TaskCard(text=text, status=status, creator_id=creator, executor_id=executor)
+                 for text, status, creator, executor in rows],
+                batch_size=500,
+            )
+
+
+def load_checkpoint(path, source):
+    if not path or not os.path.exists(path):
+        return 0
+    with open(path) as checkpoint:
+        state = json.load(checkpoint)
+    if state['source'] != source:
+        raise ValueError(f"checkpoint {path} belongs to {state['source']}")
+    return state['records']
+
+
+def save_checkpoint(path, source, records):
+    # Written after the batch commits; a crash between the two re-imports at
+    # most that one batch.
+    with open(f'{path}.tmp', 'w') as checkpoint:
+        json.dump({'source': source, 'records': records}, checkpoint)
+    os.replace(f'{path}.tmp', path)
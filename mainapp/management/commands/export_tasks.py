@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from mainapp.export import CHUNK_SIZE, export_chunks, filter_export
+from mainapp.models import TaskCard
+from mainapp.serializers import TaskCardExportFilterSerializer
+
+
+class Command(BaseCommand):
+    help = 'Stream task cards as CSV or NDJSON to stdout or a file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', choices=['csv', 'ndjson'], default='csv')
+        parser.add_argument('--file', help='write here instead of stdout')
+        parser.add_argument('--status')
+        parser.add_argument('--executor', type=int)
+        parser.add_argument('--created-after', help='ISO date or datetime, inclusive')
+        parser.add_argument('--created-before', help='ISO date or datetime, exclusive')
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        fields = TaskCardExportFilterSerializer().fields
+        params = TaskCardExportFilterSerializer(data={name: options[name] for name in fields if options[name] is not None})
+        if not params.is_valid():
+            raise CommandError(params.errors)
+        filters = dict(params.validated_data)
+        output = filters.pop('output')
+        chunks = export_chunks(filter_export(TaskCard.objects.all(), **filters), output, options['chunk_size'])
+        if options['file']:
+            with open(options['file'], 'w', encoding='utf-8', newline='') as target:
+                target.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
@@ -0,0 +1,63 @@
+import csv
+import os
+import sys
+import time
+from itertools import islice
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from mainapp.imports import BATCH_SIZE, ImportRecordError, insert_batch, load_checkpoint, parse_record, read_records, save_checkpoint
+from mainapp.signals import notify
+
+
+class Command(BaseCommand):
+    help = ('Import task cards from CSV or NDJSON (text, status, creator, executor; '
+            'creator and executor are usernames).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help="file to import, or '-' for stdin")
+        parser.add_argument('--input', choices=['csv', 'ndjson'], help='defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+        parser.add_argument('--checkpoint', help='records imported so far; an interrupted import resumes from here')
+
+    def handle(self, *args, **options):
+        source = options['source']
+        input_format = options['input'] or ('csv' if source.endswith('.csv') else 'ndjson')
+        checkpoint = options['checkpoint']
+        source_id = source if source == '-' else os.path.abspath(source)
+        try:
+            done = load_checkpoint(checkpoint, source_id)
+        except (ValueError, KeyError) as exc:
+            raise CommandError(f'Invalid checkpoint: {exc}')
+        users = dict(User.objects.values_list('username', 'id'))
+        stream = sys.stdin if source == '-' else open(source, encoding='utf-8', newline='')
+        imported = 0
+        started = time.perf_counter()
+        try:
+            records = enumerate(read_records(stream, input_format), start=1)
+            if done:
+                records = islice(records, done, None)
+                self.stdout.write(f'Resuming after record {done}')
+            while True:
+                try:
+                    batch = [parse_record(number, record, users) for number, record in islice(records, options['batch_size'])]
+                except (ImportRecordError, csv.Error) as exc:
+                    raise CommandError(f'{exc}; {done} records imported')
+                if not batch:
+                    break
+                insert_batch(batch)
+                done += len(batch)
+                imported += len(batch)
+                if checkpoint:
+                    save_checkpoint(checkpoint, source_id, done)
+                if options['verbosity'] > 0:
+                    self.stdout.write(f'{done} records, {imported / (time.perf_counter() - started):.0f} rows/s')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            if imported:
+                # bulk_create and COPY send no post_save: tell open boards and
+                # the board cache once, instead of per card.
+                notify([{'type': 'resync'}])
+        seconds = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} task cards in {seconds:.1f}s ({imported / seconds if seconds else 0:.0f} rows/s)'))
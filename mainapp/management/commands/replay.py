@@ -0,0 +1,115 @@
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import Resolver404, resolve
+from rest_framework.authtoken.models import Token
+from mainapp.traffic import build_report, compare, read_capture, timed, wait_until
+
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class Command(BaseCommand):
+    help = ('Replay a traffic capture against this database and report latencies. '
+            'Writes are replayed too: point it at a seeded copy, not production.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('capture', nargs='?', help='defaults to TRAFFIC_CAPTURE_FILE')
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--speed', type=float, default=1.0,
+                            help='speed-up over the recorded pace; 0 sends requests back to back')
+        parser.add_argument('--limit', type=int)
+        parser.add_argument('--read-only', action='store_true', help='only replay GET, HEAD and OPTIONS')
+        parser.add_argument('--host', default='localhost', help='Host header, must be in ALLOWED_HOSTS')
+        parser.add_argument('--output', help='also write the report here')
+        parser.add_argument('--baseline', help='report from an earlier replay to compare with')
+
+    def handle(self, *args, **options):
+        # Replayed requests must not be captured again, logged as slow
+        # queries or profiled: that would grow the capture on every run.
+        with override_settings(TRAFFIC_CAPTURE_ENABLED=False, SLOW_QUERY_ENABLED=False, REQUEST_PROFILING_ENABLED=False):
+            self.replay(options)
+
+    def replay(self, options):
+        try:
+            entries = list(read_capture(options['capture'] or settings.TRAFFIC_CAPTURE_FILE))
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'Cannot read the capture: {exc}')
+        if options['read_only']:
+            entries = [entry for entry in entries if entry['method'] in READ_METHODS]
+        entries = entries[:options['limit']]
+        if not entries:
+            raise CommandError('Nothing to replay.')
+        usernames = {entry['user'] for entry in entries if entry['user']}
+        users = {user.username: user for user in User.objects.filter(username__in=usernames)}
+        tokens = {}
+        local = threading.local()
+        tokens_lock = threading.Lock()
+
+        def client_for(entry):
+            # One client per thread and identity; basic auth is replayed with
+            # the user's token, since the capture holds no passwords.
+            if not hasattr(local, 'clients'):
+                local.clients = {}
+            if entry['user'] and entry['user'] not in users:
+                return None
+            key = (entry['auth'] == 'session', entry['user'])
+            if key not in local.clients:
+                client = Client(SERVER_NAME=options['host'])
+                if entry['auth'] == 'session':
+                    client.force_login(users[entry['user']])
+                elif entry['user']:
+                    with tokens_lock:
+                        if entry['user'] not in tokens:
+                            tokens[entry['user']] = Token.objects.get_or_create(user=users[entry['user']])[0].key
+                    client.defaults['HTTP_AUTHORIZATION'] = f"Token {tokens[entry['user']]}"
+                local.clients[key] = client
+            return local.clients[key]
+
+        def route(entry):
+            try:
+                return f"{entry['method']} {resolve(entry['path']).view_name}"
+            except Resolver404:
+                return f"{entry['method']} unmatched"
+
+        def call(item):
+            moment, entry = item
+            wait_until(started + moment)
+            client = client_for(entry)
+            if client is None:
+                return None
+            path = f"{entry['path']}?{entry['query']}" if entry['query'] else entry['path']
+            sent = time.perf_counter()
+            response = client.generic(entry['method'], path, (entry['body'] or '').encode(),
+                                      entry['content_type'] or 'application/octet-stream')
+            if response.streaming:
+                b''.join(response.streaming_content)
+            return route(entry), response.status_code, time.perf_counter() - sent
+
+        schedule = timed(entries, options['speed'])
+        started = time.perf_counter()
+        if options['concurrency'] > 1:
+            with ThreadPoolExecutor(max_workers=options['concurrency']) as pool:
+                results = list(pool.map(call, schedule))
+        else:
+            results = [call(item) for item in schedule]
+        seconds = time.perf_counter() - started
+        replayed = [result for result in results if result is not None]
+        if not replayed:
+            raise CommandError('None of the captured users exist in this database.')
+        report = {'capture': str(options['capture'] or settings.TRAFFIC_CAPTURE_FILE),
+                  'concurrency': options['concurrency'], 'speed': options['speed'],
+                  'skipped': len(results) - len(replayed)}
+        report.update(build_report(replayed, seconds))
+        if options['baseline']:
+            report['change'] = compare(report, json.loads(Path(options['baseline']).read_text()))
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            Path(options['output']).write_text(output + '\n')
+        self.stdout.write(output)
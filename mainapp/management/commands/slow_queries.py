@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from mainapp.slow_queries import aggregate, read_entries
+
+
+class Command(BaseCommand):
+    help = 'Rank the query shapes in the slow-query log.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', help='defaults to SLOW_QUERY_LOG')
+        parser.add_argument('--top', type=int, default=20)
+        parser.add_argument('--by', choices=['total', 'count', 'max', 'mean'], default='total')
+        parser.add_argument('--plans', action='store_true', help='print the captured EXPLAIN output')
+
+    def handle(self, *args, **options):
+        shapes = aggregate(read_entries(options['log'] or settings.SLOW_QUERY_LOG))
+        key = {'total': 'total_ms', 'count': 'count', 'max': 'max_ms', 'mean': 'mean_ms'}[options['by']]
+        shapes.sort(key=lambda shape: shape[key], reverse=True)
+        if not shapes:
+            self.stdout.write('No slow queries logged.')
+            return
+        for rank, shape in enumerate(shapes[:options['top']], start=1):
+            self.stdout.write(self.style.SUCCESS(
+                f"#{rank} {shape['count']}x, total {shape['total_ms']:.0f} ms, "
+                f"mean {shape['mean_ms']:.1f} ms, max {shape['max_ms']:.1f} ms, last {shape['last_seen']}"))
+            self.stdout.write(f"  {shape['shape']}")
+            self.stdout.write('  views: ' + ', '.join(f'{view} ({count})' for view, count in shape['views'].most_common(3)))
+            self.stdout.write('  from: ' + ', '.join(f'{location} ({count})' for location, count in shape['locations'].most_common(3)))
+            if options['plans'] and shape['plan']:
+                self.stdout.write('  plan:\n' + '\n'.join(f'    {line}' for line in shape['plan'].splitlines()))
@@ -0,0 +1,133 @@
+import re
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from functools import lru_cache
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SQL_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_NUMBER = re.compile(r'\b\d+\b')
+
+
+@lru_cache(maxsize=1024)
+def normalize_sql(sql):
+    # The query "shape": literals and IN-list lengths do not matter.
+    sql = _NUMBER.sub('?', _IN_LIST.sub('IN (...)', _STRING.sub('?', sql)))
+    return ' '.join(sql.split())
+
+
+def _labels(names, values, **extra):
+    pairs = list(zip(names, values)) + list(extra.items())
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped))
+
+
+class CounterMetric:
+    def __init__(self, name, documentation, labels):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.values = Counter()
+
+    def inc(self, labels, amount=1):
+        self.values[labels] += amount
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        for labels, value in sorted(self.values.items()):
+            lines.append(f'{self.name}{{{_labels(self.labels, labels)}}} {value}')
+        return lines
+
+
+class HistogramMetric:
+    def __init__(self, name, documentation, labels, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        self.series = {}
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * len(self.buckets), 0, 0]
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[0][index] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for labels, (counts, total, count) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, counts):
+                cumulative += bucket
+                lines.append(f'{self.name}_bucket{{{_labels(self.labels, labels, le=bound)}}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{_labels(self.labels, labels, le="+Inf")}}} {count}')
+            lines.append(f'{self.name}_sum{{{_labels(self.labels, labels)}}} {total}')
+            lines.append(f'{self.name}_count{{{_labels(self.labels, labels)}}} {count}')
+        return lines
+
+
+class QueryRecorder:
+    # Installed with wrap_queries() for one request. Only a
+    # counter per distinct SQL string is kept; shapes are worked out once at
+    # the end of the request.
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.count += 1
+            self.statements[sql] += 1
+
+    def repeated(self, threshold):
+        shapes = Counter()
+        for sql, count in self.statements.items():
+            shapes[normalize_sql(sql)] += count
+        return {shape: count for shape, count in shapes.items() if count >= threshold}
+
+
+class RequestMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = CounterMetric('http_requests_total', 'Requests by view, method and status.', ('view', 'method', 'status'))
+        self.latency = HistogramMetric('http_request_duration_seconds', 'Request latency by view.', ('view', 'method'), LATENCY_BUCKETS)
+        self.queries = HistogramMetric('db_queries_per_request', 'SQL queries per request by view.', ('view',), QUERY_COUNT_BUCKETS)
+        self.sql_time = HistogramMetric('db_query_seconds_per_request', 'Time spent in SQL per request by view.', ('view',), SQL_TIME_BUCKETS)
+        self.repeated = CounterMetric('db_repeated_query_requests_total',
+                                      'Requests that ran one query shape at least the N+1 threshold times.', ('view', 'query'))
+
+    def observe(self, view, method, status, seconds, recorder, threshold):
+        repeated = recorder.repeated(threshold) if recorder.count >= threshold else {}
+        with self._lock:
+            self.requests.inc((view, method, str(status)))
+            self.latency.observe((view, method), seconds)
+            self.queries.observe((view,), recorder.count)
+            self.sql_time.observe((view,), recorder.seconds)
+            for shape in repeated:
+                self.repeated.inc((view, shape[:200]))
+
+    def render(self, extra=()):
+        with self._lock:
+            lines = []
+            for metric in (self.requests, self.latency, self.queries, self.sql_time, self.repeated):
+                lines.extend(metric.render())
+        lines.extend(extra)
+        return '\n'.join(lines) + '\n'
+
+
+registry = RequestMetrics()
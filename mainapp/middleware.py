@@ -1,20 +1,284 @@
+import random
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
 from django.contrib import messages
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
 from django.utils import timezone
-from django.contrib.auth import logout
+from django.utils.crypto import constant_time_compare
+from django.contrib.auth import SESSION_KEY, logout
+from . import profiling, traffic
+from .metrics import QueryRecorder, registry
+from .query_wrappers import wrap_queries
+from .slow_queries import SlowQueryLog
 
 
 
-class AutoLogoutMiddleware:
+class SessionActivityStore:
+    key = 'last_activity'
+
+    def get(self, request):
+        value = request.session.get(self.key)
+        return timezone.datetime.fromisoformat(value) if value else None
+
+    def set(self, request, response, value):
+        request.session[self.key] = value.isoformat()
+
+    def clear(self, request, response):
+        request.session.pop(self.key, None)
+
+
+class CacheActivityStore:
+    def __init__(self, alias='default'):
+        self.cache = caches[alias]
+
+    def cache_key(self, request):
+        return f'last_activity:{request.user.pk}:{request.session.session_key}'
+
+    def get(self, request):
+        return self.cache.get(self.cache_key(request))
+
+    def set(self, request, response, value):
+        self.cache.set(self.cache_key(request), value, settings.AUTO_LOGOUT_TIMEOUT * 2)
+
+    def clear(self, request, response):
+        self.cache.delete(self.cache_key(request))
+
+
+class SignedCookieActivityStore:
+    cookie_name = 'last_activity'
+    salt = 'mainapp.middleware.last_activity'
+
+    def session_salt(self, request):
+        # Signed for this session only: the session key changes on login, so
+        # a cookie left over from an earlier login fails the check and is
+        # ignored instead of logging the user out again.
+        return f'{self.salt}:{request.session.session_key}'
+
+    def get(self, request):
+        value = request.get_signed_cookie(self.cookie_name, default=None, salt=self.session_salt(request))
+        return timezone.datetime.fromisoformat(value) if value else None
+
+    def set(self, request, response, value):
+        response.set_signed_cookie(self.cookie_name, value.isoformat(), salt=self.session_salt(request),
+                                   httponly=True, samesite='Lax')
+
+    def clear(self, request, response):
+        response.delete_cookie(self.cookie_name, samesite='Lax')
+
+
+ACTIVITY_STORES = {
+    'session': SessionActivityStore,
+    'cache': CacheActivityStore,
+    'cookie': SignedCookieActivityStore,
+}
+
+
+def inactivity_period(seconds):
+    minutes, rest = divmod(seconds, 60)
+    if rest or not minutes:
+        return f'{seconds} seconds'
+    return f'{minutes} minute' if minutes == 1 else f'{minutes} minutes'
+
+
+class HybridMiddleware:
+    # Runs natively under both WSGI and ASGI: a sync-only middleware makes
+    # Django run every async view through async_to_sync on a blocked thread.
+    sync_capable = async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.handle(request)
+
+    def handle(self, request):
+        raise NotImplementedError
+
+    async def __acall__(self, request):
+        raise NotImplementedError
+
+
+class AutoLogoutMiddleware(HybridMiddleware):
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.store = ACTIVITY_STORES[settings.AUTO_LOGOUT_ACTIVITY_STORE]()
+
+    def handle(self, request):
         response = self.get_response(request)
-        if request.user.is_authenticated and not request.user.is_superuser:
-            last_activity_str = request.session.get('last_activity')
-            if last_activity_str and (timezone.now() - timezone.datetime.fromisoformat(last_activity_str)).seconds > 60:
+        self.track(request, response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        # Requests without a session cookie (token API calls) have nothing to
+        # track and skip the trip to a thread for the session lookup.
+        if settings.SESSION_COOKIE_NAME in request.COOKIES:
+            await sync_to_async(self.track)(request, response)
+        return response
+
+    def track(self, request, response):
+        # Token-authenticated API calls have no login session to expire.
+        if request.user.is_authenticated and not request.user.is_superuser and SESSION_KEY in request.session:
+            now = timezone.now()
+            last_activity = self.store.get(request)
+            if last_activity and (now - last_activity).total_seconds() > settings.AUTO_LOGOUT_TIMEOUT:
+                self.store.clear(request, response)
                 logout(request)
-                messages.warning(request, 'You have been inactive for more than 1 minute. You have been automatically logged out')
-        request.session['last_activity'] = timezone.now().isoformat()
+                messages.warning(request, f'You have been inactive for more than {inactivity_period(settings.AUTO_LOGOUT_TIMEOUT)}. '
+                                          'You have been automatically logged out')
+            elif last_activity is None or (now - last_activity).total_seconds() >= settings.AUTO_LOGOUT_ACTIVITY_GRANULARITY:
+                # Activity is only recorded once per granularity window, so a
+                # busy user does not cost a session (or cache) write per hit.
+                self.store.set(request, response, now)
+
+
+class RequestMetricsMiddleware(HybridMiddleware):
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.threshold = settings.REQUEST_METRICS_REPEATED_QUERY_THRESHOLD
+
+    def handle(self, request):
+        with wrap_queries(QueryRecorder()) as recorder:
+            started = time.perf_counter()
+            response = self.get_response(request)
+        self.observe(request, response, time.perf_counter() - started, recorder)
+        return response
+
+    async def __acall__(self, request):
+        with wrap_queries(QueryRecorder()) as recorder:
+            started = time.perf_counter()
+            response = await self.get_response(request)
+        self.observe(request, response, time.perf_counter() - started, recorder)
+        return response
+
+    def observe(self, request, response, seconds, recorder):
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        registry.observe(view, request.method, response.status_code, seconds, recorder, self.threshold)
+
+
+class RequestProfilingMiddleware(HybridMiddleware):
+    def __init__(self, get_response):
+        if not settings.REQUEST_PROFILING_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def wants_profile(self, request):
+        flag = request.META.get('HTTP_X_PROFILE')
+        if flag is not None:
+            token = settings.REQUEST_PROFILING_TOKEN
+            # Token-authenticated API calls are not logged in yet at this
+            # point, so they need the profiling token.
+            return bool(token and constant_time_compare(flag, token)) or request.user.is_superuser
+        return random.random() < settings.REQUEST_PROFILING_SAMPLE_RATE
+
+    def save(self, profile, request, response):
+        try:
+            response['X-Profile'] = profile.save(request, response)
+        except Exception:
+            # A full disk or an unwritable directory must not fail the request.
+            profiling.logger.exception('Could not save the profile of %s', request.path)
+
+    def handle(self, request):
+        if not self.wants_profile(request) or not profiling.running.acquire(blocking=False):
+            return self.get_response(request)
+        try:
+            with profiling.RequestProfile() as profile, wrap_queries(profile.sql):
+                response = self.get_response(request)
+            self.save(profile, request, response)
+        finally:
+            profiling.running.release()
+        return response
+
+    async def __acall__(self, request):
+        # Under ASGI the profile covers the event loop thread, so other
+        # requests running on the loop at the same time show up in it too.
+        if 'HTTP_X_PROFILE' not in request.META and not settings.REQUEST_PROFILING_SAMPLE_RATE:
+            return await self.get_response(request)
+        if not await sync_to_async(self.wants_profile)(request) or not profiling.running.acquire(blocking=False):
+            return await self.get_response(request)
+        try:
+            with profiling.RequestProfile() as profile, wrap_queries(profile.sql):
+                response = await self.get_response(request)
+            await sync_to_async(self.save)(profile, request, response)
+        finally:
+            profiling.running.release()
         return response
-    
\ No newline at end of file
+
+
+class SlowQueryMiddleware(HybridMiddleware):
+    # Sits above the session and auth middleware, so their queries are
+    # covered as well as the view's.
+    def __init__(self, get_response):
+        if not settings.SLOW_QUERY_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+
+    def slow_query_log(self, request):
+        return SlowQueryLog(request, settings.SLOW_QUERY_THRESHOLD_MS, settings.SLOW_QUERY_EXPLAIN)
+
+    def handle(self, request):
+        with wrap_queries(self.slow_query_log(request)):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with wrap_queries(self.slow_query_log(request)):
+            return await self.get_response(request)
+
+
+class TrafficRecorderMiddleware(HybridMiddleware):
+    def __init__(self, get_response):
+        if not settings.TRAFFIC_CAPTURE_ENABLED:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.exclude = tuple(settings.TRAFFIC_CAPTURE_EXCLUDE)
+
+    def wants_capture(self, request):
+        return not request.path.startswith(self.exclude) and random.random() < settings.TRAFFIC_CAPTURE_SAMPLE_RATE
+
+    def handle(self, request):
+        if not self.wants_capture(request):
+            return self.get_response(request)
+        # Read before the view does, so the body can still be recorded.
+        body = traffic.capture_body(request)
+        at = time.time()
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self.record(request, response, body, at, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        if not self.wants_capture(request):
+            return await self.get_response(request)
+        body = traffic.capture_body(request)
+        at = time.time()
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        # The user may still be a lazy session lookup, and the file is appended
+        # to under a lock: both stay off the event loop.
+        await sync_to_async(self.record)(request, response, body, at, time.perf_counter() - started)
+        return response
+
+    def record(self, request, response, body, at, seconds):
+        auth, user = traffic.identity(request)
+        traffic.record({
+            'at': round(at, 3),
+            'method': request.method,
+            'path': request.path,
+            'query': request.META.get('QUERY_STRING', ''),
+            'content_type': request.content_type if body is not None else None,
+            'body': body,
+            'auth': auth,
+            'user': user,
+            'status': response.status_code,
+            'ms': round(seconds * 1000, 2),
+        })
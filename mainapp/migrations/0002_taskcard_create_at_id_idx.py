@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='taskcard',
+            index=models.Index(fields=['-create_at', '-id'], name='taskcard_create_at_id_idx'),
+        ),
+    ]
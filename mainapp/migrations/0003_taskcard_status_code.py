@@ -0,0 +1,65 @@
+from django.db import migrations, models
+import mainapp.models
+
+
+STATUS_CODES = {
+    'New': 1,
+    'In progress': 2,
+    'In QA': 3,
+    'Ready': 4,
+    'Done': 5,
+}
+
+
+def labels_to_codes(apps, schema_editor):
+    TaskCard = apps.get_model('mainapp', 'TaskCard')
+    for label, code in STATUS_CODES.items():
+        TaskCard.objects.filter(status=label).update(status_code=code)
+
+
+def codes_to_labels(apps, schema_editor):
+    TaskCard = apps.get_model('mainapp', 'TaskCard')
+    for label, code in STATUS_CODES.items():
+        TaskCard.objects.filter(status_code=code).update(status=label)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0002_taskcard_create_at_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskcard',
+            name='status_code',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        migrations.RunPython(labels_to_codes, codes_to_labels),
+        migrations.RemoveField(
+            model_name='taskcard',
+            name='status',
+        ),
+        migrations.RenameField(
+            model_name='taskcard',
+            old_name='status_code',
+            new_name='status',
+        ),
+        migrations.AlterField(
+            model_name='taskcard',
+            name='status',
+            field=mainapp.models.StatusField(default='New'),
+        ),
+        migrations.AddIndex(
+            model_name='taskcard',
+            index=models.Index(fields=['status', 'update_at'], name='taskcard_status_update_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taskcard',
+            index=models.Index(fields=['executor', 'status'], name='taskcard_executor_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taskcard',
+            index=models.Index(fields=['creator', 'status'], name='taskcard_creator_status_idx'),
+        ),
+    ]
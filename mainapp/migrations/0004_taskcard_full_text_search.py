@@ -0,0 +1,68 @@
+from django.db import migrations
+
+
+# The search index lives outside the model: a generated tsvector column with a
+# GIN index on PostgreSQL, an external-content FTS5 table kept current by
+# triggers on SQLite. Both follow every INSERT/UPDATE/DELETE, including
+# bulk_update() and queryset.update().
+POSTGRESQL_FORWARD = [
+    "ALTER TABLE mainapp_taskcard ADD COLUMN search_vector tsvector "
+    "GENERATED ALWAYS AS (to_tsvector('english', coalesce(text, ''))) STORED",
+    "CREATE INDEX taskcard_search_vector_idx ON mainapp_taskcard USING GIN (search_vector)",
+]
+POSTGRESQL_BACKWARD = [
+    "DROP INDEX IF EXISTS taskcard_search_vector_idx",
+    "ALTER TABLE mainapp_taskcard DROP COLUMN IF EXISTS search_vector",
+]
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE mainapp_taskcard_fts USING fts5(text, content='mainapp_taskcard', content_rowid='id')",
+    "CREATE TRIGGER mainapp_taskcard_fts_insert AFTER INSERT ON mainapp_taskcard BEGIN "
+    "INSERT INTO mainapp_taskcard_fts (rowid, text) VALUES (new.id, new.text); END",
+    "CREATE TRIGGER mainapp_taskcard_fts_delete AFTER DELETE ON mainapp_taskcard BEGIN "
+    "INSERT INTO mainapp_taskcard_fts (mainapp_taskcard_fts, rowid, text) VALUES ('delete', old.id, old.text); END",
+    "CREATE TRIGGER mainapp_taskcard_fts_update AFTER UPDATE OF text ON mainapp_taskcard BEGIN "
+    "INSERT INTO mainapp_taskcard_fts (mainapp_taskcard_fts, rowid, text) VALUES ('delete', old.id, old.text); "
+    "INSERT INTO mainapp_taskcard_fts (rowid, text) VALUES (new.id, new.text); END",
+    "INSERT INTO mainapp_taskcard_fts (mainapp_taskcard_fts) VALUES ('rebuild')",
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS mainapp_taskcard_fts_insert",
+    "DROP TRIGGER IF EXISTS mainapp_taskcard_fts_delete",
+    "DROP TRIGGER IF EXISTS mainapp_taskcard_fts_update",
+    "DROP TABLE IF EXISTS mainapp_taskcard_fts",
+]
+
+
+def sqlite_has_fts5(schema_editor):
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        return bool(cursor.fetchone()[0])
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        statements = POSTGRESQL_FORWARD
+    elif vendor == 'sqlite' and sqlite_has_fts5(schema_editor):
+        statements = SQLITE_FORWARD
+    else:
+        return
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    statements = {'postgresql': POSTGRESQL_BACKWARD, 'sqlite': SQLITE_BACKWARD}.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0003_taskcard_status_code'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 13:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('mainapp', '0004_taskcard_full_text_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskCardTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task_id', models.BigIntegerField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='taskcard',
+            index=models.Index(fields=['update_at', 'id'], name='taskcard_update_at_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='taskcardtombstone',
+            index=models.Index(fields=['deleted_at', 'task_id'], name='tombstone_deleted_at_idx'),
+        ),
+    ]
@@ -1,13 +1,98 @@
+from django.core import exceptions
 from django.db import models
 
 
+class Status(models.IntegerChoices):
+    NEW = 1, 'New'
+    IN_PROGRESS = 2, 'In progress'
+    IN_QA = 3, 'In QA'
+    READY = 4, 'Ready'
+    DONE = 5, 'Done'
+
+
+STATUS_CODES = {status.label: status.value for status in Status}
+
+
+class StatusField(models.PositiveSmallIntegerField):
+    # Python code keeps working with the status labels ('In QA'), the database
+    # only ever sees the small integer codes.
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('choices', [(label, label) for label in Status.labels])
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        kwargs.pop('choices', None)
+        return name, path, args, kwargs
+
+    @property
+    def validators(self):
+        return list(self._validators)
+
+    def from_db_value(self, value, expression, connection):
+        if value is None:
+            return value
+        return Status(value).label
+
+    def to_python(self, value):
+        if value is None or value in STATUS_CODES:
+            return value
+        try:
+            return Status(int(value)).label
+        except (TypeError, ValueError):
+            raise exceptions.ValidationError(f"'{value}' is not a valid status.", code='invalid')
+
+    def get_prep_value(self, value):
+        if value is None or isinstance(value, int):
+            return value
+        if value not in STATUS_CODES:
+            raise ValueError(f"Field '{self.name}' expected a status, got {value!r}.")
+        return STATUS_CODES[value]
+
+
 class TaskCard(models.Model):
+    STATUSES = tuple(Status.labels)
+    TRACKED_FIELDS = ('text', 'status', 'executor_id')
+
     text = models.TextField(null=True, blank=True)
     create_at = models.DateTimeField(auto_now_add=True)
     update_at = models.DateTimeField(auto_now=True)
-    status = models.TextField(max_length=30, default='New')
+    status = StatusField(default='New')
     creator = models.ForeignKey("auth.User", on_delete=models.CASCADE, related_name = 'user_creator')
     executor = models.ForeignKey("auth.User", on_delete=models.CASCADE, null=True, blank=True, related_name = 'user_executor')
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['-create_at', '-id'], name='taskcard_create_at_id_idx'),
+            models.Index(fields=['status', 'update_at'], name='taskcard_status_update_idx'),
+            models.Index(fields=['executor', 'status'], name='taskcard_executor_status_idx'),
+            models.Index(fields=['creator', 'status'], name='taskcard_creator_status_idx'),
+            models.Index(fields=['update_at', 'id'], name='taskcard_update_at_id_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.remember_loaded_values()
+        return instance
+
+    def remember_loaded_values(self):
+        # Lets post_save tell which of the board-visible fields changed.
+        self._loaded_values = {attname: self.__dict__[attname] for attname in self.TRACKED_FIELDS if attname in self.__dict__}
+
+    def __str__(self) -> str:
+        return f"Task {self.creator} |{self.text}|"
+
+
+class TaskCardTombstone(models.Model):
+    task_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['deleted_at', 'task_id'], name='tombstone_deleted_at_idx'),
+        ]
+
     def __str__(self) -> str:
-        return f"Task {self.creator} |{self.text}|"
\ No newline at end of file
+        return f"Deleted task {self.task_id}"
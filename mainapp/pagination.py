@@ -0,0 +1,58 @@
+from rest_framework.pagination import BasePagination, CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+
+class TaskCardCursorPagination(CursorPagination):
+    ordering = ('-create_at', '-id')
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+
+
+class TaskCardSearchPagination(BasePagination):
+    # Ranked results have no stable keyset, so search pages by number. The
+    # extra row fetched tells whether there is a next page, no COUNT needed.
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    page_query_param = 'page'
+
+    def _positive_int(self, value, default, cutoff=None):
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            return default
+        if value < 1:
+            return default
+        return min(value, cutoff) if cutoff else value
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page = self._positive_int(request.query_params.get(self.page_query_param), 1)
+        size = self._positive_int(request.query_params.get(self.page_size_query_param), self.page_size, self.max_page_size)
+        offset = (self.page - 1) * size
+        rows = list(queryset[offset:offset + size + 1])
+        self.has_next = len(rows) > size
+        return rows[:size]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.page_query_param, self.page + 1)
+
+    def get_previous_link(self):
+        if self.page == 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.page - 1)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
@@ -4,7 +4,7 @@ from rest_framework.permissions import BasePermission
 
 class TaskCardPermission(BasePermission):
     def has_permission(self, request, view):
-        if view.action == 'create' or view.action == 'list':
+        if view.action in ['create', 'list', 'bulk', 'sync', 'export']:
             return request.user.is_authenticated 
         return True
     
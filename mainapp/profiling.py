@@ -0,0 +1,165 @@
+import cProfile
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from django.conf import settings
+
+
+PROFILE_NAME = re.compile(r'^\d{8}T\d{6}-\d{6}-[\w.-]+$')
+UNSAFE = re.compile(r'[^\w.-]')
+FILES = {'pstats': '.pstats', 'collapsed': '.collapsed', 'sql': '.json'}
+# Statements whose parameters may hold session keys, API tokens or password
+# hashes; their parameters are not written to disk.
+SECRET_SQL = re.compile(r'authtoken_token|django_session|password', re.IGNORECASE)
+
+logger = logging.getLogger(__name__)
+
+# One profiled request at a time: a burst of sampled or flagged requests
+# must not turn into a burst of profiler overhead.
+running = threading.Lock()
+
+
+def frame_name(code):
+    path = code.co_filename
+    for root in sorted(sys.path, key=len, reverse=True):
+        if root and path.startswith(root + os.sep):
+            path = path[len(root) + 1:]
+            break
+    return f'{code.co_name} ({path}:{code.co_firstlineno})'
+
+
+def collapse(frame):
+    names = []
+    while frame is not None:
+        names.append(frame_name(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+class StackSampler(threading.Thread):
+    # Samples one thread's stack every `interval` seconds into collapsed
+    # ("folded") stacks: `outer;inner;leaf count`, as flamegraph tools read.
+    def __init__(self, thread_id, interval):
+        super().__init__(daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[collapse(frame)] += 1
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+
+class SQLCapture:
+    def __init__(self):
+        self.statements = []
+
+    def params(self, sql, params, many):
+        if not params or many:
+            return None
+        if SECRET_SQL.search(sql):
+            return '[redacted]'
+        return [repr(param) for param in params]
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.statements.append({
+                'sql': sql,
+                'params': self.params(sql, params, many),
+                'many': many,
+                'ms': round((time.perf_counter() - started) * 1000, 3),
+            })
+
+
+class RequestProfile:
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+        self.sampler = StackSampler(threading.get_ident(), settings.REQUEST_PROFILING_INTERVAL)
+        self.sql = SQLCapture()
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        self.sampler.start()
+        self.profiler.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.disable()
+        self.sampler.stop()
+        self.seconds = time.perf_counter() - self.started
+
+    def save(self, request, response, directory=None):
+        directory = Path(directory or settings.REQUEST_PROFILING_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        name = f"{datetime.now():%Y%m%dT%H%M%S-%f}-{UNSAFE.sub('_', view)}"
+        self.profiler.dump_stats(directory / f'{name}.pstats')
+        (directory / f'{name}.collapsed').write_text(
+            ''.join(f'{stack} {count}\n' for stack, count in self.sampler.stacks.most_common()))
+        summary = {
+            'name': name,
+            'method': request.method,
+            'path': request.get_full_path(),
+            'view': view,
+            'status': response.status_code,
+            'ms': round(self.seconds * 1000, 1),
+            'user': request.user.username if hasattr(request, 'user') and request.user.is_authenticated else None,
+            'queries': len(self.sql.statements),
+            'sql_ms': round(sum(statement['ms'] for statement in self.sql.statements), 1),
+            'statements': self.sql.statements,
+        }
+        (directory / f'{name}.json').write_text(json.dumps(summary, indent=1))
+        rotate(directory, settings.REQUEST_PROFILING_KEEP)
+        return name
+
+
+def profile_names(directory=None):
+    directory = Path(directory or settings.REQUEST_PROFILING_DIR)
+    if not directory.is_dir():
+        return []
+    return sorted((path.stem for path in directory.glob('*.json') if PROFILE_NAME.match(path.stem)), reverse=True)
+
+
+def rotate(directory, keep):
+    for name in profile_names(directory)[keep:]:
+        for suffix in FILES.values():
+            (directory / f'{name}{suffix}').unlink(missing_ok=True)
+
+
+def recent_profiles(directory=None, limit=100):
+    directory = Path(directory or settings.REQUEST_PROFILING_DIR)
+    profiles = []
+    for name in profile_names(directory)[:limit]:
+        try:
+            summary = json.loads((directory / f'{name}.json').read_text())
+        except (OSError, ValueError):
+            continue
+        summary.pop('statements', None)
+        profiles.append(summary)
+    return profiles
+
+
+def profile_file(name, kind, directory=None):
+    # None unless `name` is a profile we wrote: names come from the URL.
+    if kind not in FILES or not PROFILE_NAME.match(name):
+        return None
+    path = Path(directory or settings.REQUEST_PROFILING_DIR) / f'{name}{FILES[kind]}'
+    return path if path.is_file() else None
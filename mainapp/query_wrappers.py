@@ -0,0 +1,35 @@
+import contextvars
+from contextlib import contextmanager
+from functools import partial
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+# connection.execute_wrapper() only covers the calling thread's connection,
+# but the async ORM runs its queries in a worker thread. The wrappers for the
+# current request live in a context variable instead, which sync_to_async
+# carries into that thread, and every connection runs them.
+_wrappers = contextvars.ContextVar('query_wrappers', default=())
+
+
+def run_wrappers(execute, sql, params, many, context):
+    for wrapper in reversed(_wrappers.get()):
+        execute = partial(wrapper, execute)
+    return execute(sql, params, many, context)
+
+
+@contextmanager
+def wrap_queries(wrapper):
+    token = _wrappers.set(_wrappers.get() + (wrapper,))
+    try:
+        yield wrapper
+    finally:
+        _wrappers.reset(token)
+
+
+@receiver(connection_created)
+def install(sender, connection, **kwargs):
+    # Inserted first: connection.execute_wrapper() pops the last entry when
+    # its block ends, which would drop this one if the connection opened there.
+    if run_wrappers not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, run_wrappers)
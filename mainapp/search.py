@@ -0,0 +1,53 @@
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+
+FTS_TABLE = 'mainapp_taskcard_fts'
+
+_sqlite_fts = {}
+
+
+def _has_sqlite_fts():
+    if connection.alias not in _sqlite_fts:
+        _sqlite_fts[connection.alias] = FTS_TABLE in connection.introspection.table_names()
+    return _sqlite_fts[connection.alias]
+
+
+def _fts5_query(query):
+    # Every word becomes a quoted FTS5 string, so user input can never be
+    # parsed as FTS5 syntax (NEAR, column filters, stray quotes...).
+    return ' '.join('"{}"'.format(term.replace('"', '""')) for term in query.split())
+
+
+def search_tasks(queryset, query, ranked=True):
+    if not query.split():
+        return queryset.none()
+    if connection.vendor == 'postgresql':
+        condition = RawSQL(
+            "mainapp_taskcard.search_vector @@ websearch_to_tsquery('english', %s)",
+            [query], output_field=BooleanField(),
+        )
+        rank = RawSQL(
+            "ts_rank(mainapp_taskcard.search_vector, websearch_to_tsquery('english', %s))",
+            [query], output_field=FloatField(),
+        )
+    elif connection.vendor == 'sqlite' and _has_sqlite_fts():
+        match = _fts5_query(query)
+        condition = RawSQL(
+            f'mainapp_taskcard.id IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s)',
+            [match], output_field=BooleanField(),
+        )
+        rank = RawSQL(
+            f'(SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s AND rowid = mainapp_taskcard.id)',
+            [match], output_field=FloatField(),
+        )
+    else:
+        condition = Q()
+        for term in query.split():
+            condition &= Q(text__icontains=term)
+        rank = Value(0.0, output_field=FloatField())
+    queryset = queryset.filter(condition)
+    if ranked:
+        queryset = queryset.annotate(search_rank=rank).order_by('-search_rank', '-id')
+    return queryset
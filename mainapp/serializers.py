@@ -1,59 +1,78 @@
 from rest_framework import serializers
 from .models import TaskCard
-from django.contrib.auth.models import User
+from django.db import transaction
+from . import transitions
+from .sparse import SparseFieldsMixin
 
 
 
-class TaskCardSerializer(serializers.ModelSerializer):
+class TaskCardSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = TaskCard
         fields = ('id', 'text', 'status', 'creator', 'executor', 'create_at')
+        extra_kwargs = {'text': {'required': True}}
 
     def create(self, validated_data):
         return TaskCard.objects.create(text=validated_data['text'], creator=self.context['request'].user)
 
-    def update(self, instance, validated_data):
+    def apply_changes(self, instance, validated_data):
+        user = self.context['request'].user
+        update_fields = []
+        new_status = None
         if 'text' in validated_data:
-            if self.context['request'].user.is_superuser or self.context['request'].user == instance.creator:
+            if user.is_superuser or user.pk == instance.creator_id:
                 instance.text = validated_data['text']
+                update_fields.append('text')
             else: raise serializers.ValidationError("Ne baluisya")
         if 'status' in validated_data:
-            if self.context['request'].user == instance.executor:
-                allowed_transitions = {
-            'New': ['In progress'],
-            'In progress': ['In QA', 'New'],
-            'In QA': ['Ready', 'In progress'],
-            'Ready': ['In QA']
-        }
-            elif self.context['request'].user.is_superuser:
-                allowed_transitions = {
-            'Ready': ['Done'],
-            'Done': ['Ready']
-        }
-            else: raise serializers.ValidationError("Ne baluisya")
+            allowed_transitions = transitions.allowed_transitions(user, instance)
+            if allowed_transitions is None:
+                raise serializers.ValidationError("Ne baluisya")
             current_status = instance.status
-            new_status = validated_data['status']
             if current_status in allowed_transitions:
-                if new_status in allowed_transitions[current_status]:
-                    instance.status = new_status
+                if validated_data['status'] in allowed_transitions[current_status]:
+                    new_status = validated_data['status']
                 else:
                     raise serializers.ValidationError("There is no such option to switch between statuses")
         if 'executor' in validated_data:
-            if self.context['request'].user == instance.creator:
-                if validated_data['executor'] == self.context['request'].user:
+            if user.pk == instance.creator_id:
+                if validated_data['executor'] == user:
                     instance.executor = validated_data['executor']
-            elif self.context['request'].user.is_superuser:
-                instance.executor = User.objects.get(id=validated_data['executor'].id)
+                    update_fields.append('executor')
+            elif user.is_superuser:
+                instance.executor = validated_data['executor']
+                update_fields.append('executor')
             else:
-                if not self.context['request'].user.is_superuser:
-                    raise serializers.ValidationError("You cannot assign another user as an executor")
-                else:
-                    instance.executor = validated_data['executor']
-        instance.save()
+                raise serializers.ValidationError("You cannot assign another user as an executor")
+        return update_fields, new_status
+
+    def update(self, instance, validated_data):
+        update_fields, new_status = self.apply_changes(instance, validated_data)
+        with transaction.atomic():
+            if new_status is not None:
+                if not transitions.transition(instance.pk, instance.status, new_status):
+                    raise serializers.ValidationError("The task status has been changed by someone else")
+                instance.status = new_status
+            if update_fields:
+                instance.save(update_fields=update_fields + ['update_at'])
         return instance
     
 
-class TaskCardSerializerForFilter(serializers.ModelSerializer):
+class TaskCardSerializerForFilter(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = TaskCard
-        fields = ('id', 'creator', 'executor', 'update_at')
\ No newline at end of file
+        fields = ('id', 'creator', 'executor', 'update_at')
+
+
+class TaskCardSyncSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = TaskCard
+        fields = ('id', 'text', 'status', 'creator', 'executor', 'create_at', 'update_at')
+
+
+class TaskCardExportFilterSerializer(serializers.Serializer):
+    output = serializers.ChoiceField(choices=['csv', 'ndjson'], default='csv')
+    status = serializers.ChoiceField(choices=TaskCard.STATUSES, required=False)
+    executor = serializers.IntegerField(required=False)
+    created_after = serializers.DateTimeField(required=False, input_formats=['iso-8601', '%Y-%m-%d'])
+    created_before = serializers.DateTimeField(required=False, input_formats=['iso-8601', '%Y-%m-%d'])
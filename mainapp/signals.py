@@ -0,0 +1,73 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+from .models import TaskCard, TaskCardTombstone
+from .sparse import USER_FIELDS
+
+
+# Sent after commit with events=[{'type': 'create'|'update'|'status'|'executor'|'delete', 'id': ..., ...}].
+# Paths that bypass model signals (transitions, bulk operations) send it too.
+task_cards_changed = Signal()
+
+
+def card_event(kind, task):
+    event = {'type': kind, 'id': task.pk}
+    if kind == 'create':
+        event.update(status=task.status, text=task.text,
+                     creator=str(task.creator) if TaskCard.creator.is_cached(task) else None)
+    elif kind == 'update':
+        event['text'] = task.text
+    elif kind == 'status':
+        event['status'] = task.status
+    elif kind == 'executor':
+        event['executor'] = task.executor_id
+        event['executor_name'] = str(task.executor) if TaskCard.executor.is_cached(task) and task.executor else None
+    return event
+
+
+def notify(events):
+    if events:
+        transaction.on_commit(lambda: task_cards_changed.send(sender=TaskCard, events=events))
+
+
+def changed_fields(task):
+    loaded = getattr(task, '_loaded_values', {})
+    return {attname for attname in TaskCard.TRACKED_FIELDS
+            if attname not in loaded or getattr(task, attname) != loaded[attname]}
+
+
+@receiver(post_save, sender=TaskCard)
+def publish_save(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        events = [card_event('create', instance)]
+    else:
+        fields = changed_fields(instance)
+        if update_fields is not None:
+            fields &= {TaskCard._meta.get_field(name).attname for name in update_fields}
+        events = [card_event(kind, instance) for attname, kind in (('text', 'update'), ('status', 'status'), ('executor_id', 'executor'))
+                  if attname in fields]
+    instance.remember_loaded_values()
+    notify(events)
+
+
+@receiver(post_delete, sender=TaskCard)
+def record_tombstone(sender, instance, **kwargs):
+    TaskCardTombstone.objects.create(task_id=instance.pk)
+    notify([{'type': 'delete', 'id': instance.pk}])
+
+
+def may_rename(created, update_fields):
+    # Logins save last_login alone.
+    return not created and (update_fields is None or bool(set(update_fields) & set(USER_FIELDS)))
+
+
+@receiver(post_save, sender=User)
+def touch_user_tasks(sender, instance, created, update_fields=None, **kwargs):
+    # Cards show their users' names, but validators and the board cache only
+    # look at the task table, so a rename moves update_at on the user's cards.
+    if not may_rename(created, update_fields):
+        return
+    TaskCard.objects.filter(Q(creator=instance) | Q(executor=instance)).update(update_at=timezone.now())
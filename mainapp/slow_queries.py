@@ -0,0 +1,135 @@
+import json
+import os
+import threading
+import time
+import traceback
+from collections import Counter
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+from . import query_wrappers
+from .metrics import normalize_sql
+
+
+EXPLAIN_SQL = {
+    'postgresql': ('EXPLAIN (ANALYZE, BUFFERS) ', 'EXPLAIN '),
+    'sqlite': ('EXPLAIN QUERY PLAN ', 'EXPLAIN QUERY PLAN '),
+}
+
+_write_lock = threading.Lock()
+_explained = set()
+_local = threading.local()
+
+
+def call_site():
+    # The innermost frame in the project's own code, outside the wrappers.
+    root = str(settings.BASE_DIR) + os.sep
+    skip = (__file__, query_wrappers.__file__)
+    for frame in reversed(traceback.extract_stack()):
+        if frame.filename.startswith(root) and frame.filename not in skip and 'site-packages' not in frame.filename:
+            return f'{frame.filename[len(root):]}:{frame.lineno} in {frame.name}'
+    return None
+
+
+def explain(connection, sql, params):
+    # EXPLAIN ANALYZE runs the statement again, so only reads are analyzed,
+    # and each shape is only explained once per process. The savepoint keeps
+    # a failed EXPLAIN from breaking the request's transaction on PostgreSQL.
+    statements = EXPLAIN_SQL.get(connection.vendor)
+    if statements is None:
+        return None
+    analyze, plain = statements
+    prefix = analyze if sql.lstrip()[:6].upper() == 'SELECT' else plain
+    _local.explaining = True
+    try:
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            return '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+    except DatabaseError as exc:
+        return f'EXPLAIN failed: {exc}'
+    finally:
+        _local.explaining = False
+
+
+def write_entry(entry):
+    path = settings.SLOW_QUERY_LOG
+    line = json.dumps(entry, default=str) + '\n'
+    with _write_lock:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            if os.path.getsize(path) + len(line) > settings.SLOW_QUERY_LOG_MAX_BYTES:
+                os.replace(path, f'{path}.1')
+        except FileNotFoundError:
+            pass
+        with open(path, 'a', encoding='utf-8') as log:
+            log.write(line)
+
+
+class SlowQueryLog:
+    # An execute wrapper for one request: statements over the threshold are
+    # logged with their shape, the view and the line of our code that ran them.
+    def __init__(self, request, threshold_ms, explain_plans=False):
+        self.request = request
+        self.threshold = threshold_ms / 1000
+        self.explain_plans = explain_plans
+
+    def view(self):
+        match = self.request.resolver_match
+        return match.view_name if match else self.request.path
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            seconds = time.perf_counter() - started
+            if seconds >= self.threshold and not getattr(_local, 'explaining', False):
+                self.record(sql, params, many, context['connection'], seconds)
+
+    def record(self, sql, params, many, connection, seconds):
+        shape = normalize_sql(sql)
+        entry = {
+            'at': timezone.now().isoformat(),
+            'ms': round(seconds * 1000, 1),
+            'shape': shape,
+            'sql': sql,
+            'view': self.view(),
+            'location': call_site(),
+            'plan': None,
+        }
+        if self.explain_plans and not many and (connection.alias, shape) not in _explained:
+            _explained.add((connection.alias, shape))
+            entry['plan'] = explain(connection, sql, params)
+        write_entry(entry)
+
+
+def read_entries(path):
+    for name in (f'{path}.1', path):
+        try:
+            with open(name, encoding='utf-8') as log:
+                for line in log:
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+        except FileNotFoundError:
+            continue
+
+
+def aggregate(entries):
+    shapes = {}
+    for entry in entries:
+        shape = shapes.setdefault(entry['shape'], {
+            'shape': entry['shape'], 'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+            'views': Counter(), 'locations': Counter(), 'plan': None, 'last_seen': None,
+        })
+        shape['count'] += 1
+        shape['total_ms'] += entry['ms']
+        shape['max_ms'] = max(shape['max_ms'], entry['ms'])
+        shape['views'][entry['view']] += 1
+        shape['locations'][entry['location']] += 1
+        shape['plan'] = entry['plan'] or shape['plan']
+        shape['last_seen'] = entry['at']
+    for shape in shapes.values():
+        shape['mean_ms'] = shape['total_ms'] / shape['count']
+    return list(shapes.values())
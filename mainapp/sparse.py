@@ -0,0 +1,65 @@
+from rest_framework import serializers
+
+
+# Loaded whatever ?fields= asks for: cursor pagination reads create_at and the
+# ETag/Last-Modified validators read update_at.
+ALWAYS_LOADED = ('id', 'create_at', 'update_at')
+EXPANDABLE = ('creator', 'executor')
+USER_FIELDS = ('id', 'username', 'first_name', 'last_name')
+
+
+class SparseFieldsMixin:
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+def parse_fields(value, serializer_class):
+    # The ?fields= names, or None when the parameter is absent.
+    if value is None:
+        return None
+    names = list(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    allowed = serializer_class.Meta.fields
+    unknown = [name for name in names if name not in allowed]
+    if unknown or not names:
+        raise serializers.ValidationError({'fields': [
+            f"Unknown fields: {', '.join(unknown) or '(none given)'}; choose from {', '.join(allowed)}"]})
+    return names
+
+
+def parse_expand(value):
+    # The ?expand= relations, () when the parameter is absent.
+    if value is None:
+        return ()
+    names = tuple(dict.fromkeys(name.strip() for name in value.split(',') if name.strip()))
+    unknown = [name for name in names if name not in EXPANDABLE]
+    if unknown or not names:
+        raise serializers.ValidationError({'expand': [
+            f"Unknown relations: {', '.join(unknown) or '(none given)'}; choose from {', '.join(EXPANDABLE)}"]})
+    return names
+
+
+def project(queryset, fields, expand=()):
+    # Columns the serializer will not read, above all `text`, are not
+    # selected; expanded users are joined in, with their public columns only.
+    if not expand:
+        return queryset if fields is None else queryset.only(*dict.fromkeys((*fields, *ALWAYS_LOADED)))
+    if fields is None:
+        columns = [field.name for field in queryset.model._meta.concrete_fields]
+    else:
+        columns = [*fields, *ALWAYS_LOADED, *expand]
+    related = [f'{name}__{column}' for name in expand for column in USER_FIELDS]
+    return queryset.select_related(*expand).only(*dict.fromkeys((*columns, *related)))
+
+
+def expanded_users(tasks, expand):
+    # Each user once, keyed by the id the cards carry in creator/executor.
+    users = {}
+    for task in tasks:
+        for name in expand:
+            user = getattr(task, name)
+            if user is not None and str(user.pk) not in users:
+                users[str(user.pk)] = {field: getattr(user, field) for field in USER_FIELDS}
+    return users
@@ -0,0 +1,67 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.db.models import BooleanField, Q, Value
+from django.utils import timezone
+from rest_framework import serializers
+from .models import TaskCard, TaskCardTombstone
+
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+# Rows are stamped before their transaction commits, so the newest couple of
+# seconds are left for the next poll instead of being skipped forever.
+SETTLE_DELAY = timedelta(seconds=2)
+DEFAULT_LIMIT = 500
+MAX_LIMIT = 1000
+
+
+def encode_cursor(moment, pk):
+    return f'{(moment - EPOCH) // timedelta(microseconds=1)}-{pk}'
+
+
+def decode_cursor(cursor):
+    # Out-of-range parts overflow datetime, or bigint in the database.
+    try:
+        micros, pk = cursor.split('-')
+        moment, pk = EPOCH + timedelta(microseconds=int(micros)), int(pk)
+        if pk >= 2 ** 63:
+            raise OverflowError
+        return moment, pk
+    except (ValueError, OverflowError):
+        raise serializers.ValidationError({'since': ["Invalid cursor"]})
+
+
+def parse_limit(value):
+    try:
+        return max(1, min(int(value), MAX_LIMIT))
+    except (TypeError, ValueError):
+        return DEFAULT_LIMIT
+
+
+def _after(moment_field, pk_field, position):
+    if position is None:
+        return Q()
+    moment, pk = position
+    return Q(**{f'{moment_field}__gt': moment}) | Q(**{moment_field: moment, f'{pk_field}__gt': pk})
+
+
+def changes_since(cursor=None, limit=DEFAULT_LIMIT):
+    position = decode_cursor(cursor) if cursor else None
+    horizon = timezone.now() - SETTLE_DELAY
+    changed = (TaskCard.objects.filter(_after('update_at', 'id', position), update_at__lte=horizon)
+               .annotate(deleted=Value(False, output_field=BooleanField()))
+               .values_list('id', 'update_at', 'deleted'))
+    deleted = (TaskCardTombstone.objects.filter(_after('deleted_at', 'task_id', position), deleted_at__lte=horizon)
+               .annotate(deleted=Value(True, output_field=BooleanField()))
+               .values_list('task_id', 'deleted_at', 'deleted'))
+    # A caught-up client costs this one query: two index range scans that
+    # come back empty.
+    rows = list(changed.union(deleted, all=True).order_by('update_at', 'id')[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    changed_ids = [pk for pk, _, is_deleted in rows if not is_deleted]
+    cards = TaskCard.objects.in_bulk(changed_ids) if changed_ids else {}
+    return {
+        'changes': [cards[pk] for pk in changed_ids if pk in cards],
+        'deleted': [pk for pk, _, is_deleted in rows if is_deleted],
+        'cursor': encode_cursor(rows[-1][1], rows[-1][0]) if rows else cursor,
+        'has_more': has_more,
+    }
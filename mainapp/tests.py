@@ -1,13 +1,52 @@
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.contrib.auth.models import User
 from django.urls import reverse
-from .models import TaskCard
+from .models import TaskCard, Status
 from .forms import SetExecutorForm
 from django.utils import timezone
 from rest_framework.test import APIClient, APITestCase
+from rest_framework.authtoken.models import Token
 from rest_framework import status
 from django.contrib import messages
 from .middleware import AutoLogoutMiddleware
+from .board import build_board, parse_cursors, prepare_cards
+from .board_cache import BoardCache, board_cache
+import time
+from .signals import task_cards_changed
+from .events import BroadcastHub, hub
+from asgiref.sync import sync_to_async
+import asyncio
+import logging
+from asgiref.sync import iscoroutinefunction
+from django.core.handlers.asgi import ASGIHandler
+from . import imports, transitions
+from .serializers import TaskCardSerializer
+from rest_framework.exceptions import ValidationError
+from .views import TaskCardListView
+from unittest import mock
+from django.core.management import CommandError, call_command
+import csv
+import io
+import json
+import os
+import pstats
+import tempfile
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.template.loader import get_template
+from django.db import connection
+from django.contrib.sessions.models import Session
+from django.conf import settings
+from django.test.utils import CaptureQueriesContext
+from .metrics import QueryRecorder, RequestMetrics, normalize_sql
+from .traffic import read_capture
+from accountsapp.authentication import ProblemBookTokenAuthentication
+
+
+def tearDownModule():
+    # Token requests leave last-seen writes pending for the atexit flush,
+    # which would run after the test database is gone.
+    ProblemBookTokenAuthentication.activity.clear()
 
 
 
@@ -23,9 +62,16 @@ class TaskCardListViewTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'tasks.html')
         self.assertContains(response, 'Task text')  
-        form = response.context['form']
-        self.assertIsInstance(form, SetExecutorForm)  
-        self.assertEqual(form.user, self.user)  
+        self.assertNotIn('form', response.context)
+        self.assertContains(response, reverse('executor_lookup'))
+
+    def test_search_box_keeps_the_term_with_long_columns(self):
+        TaskCard.objects.bulk_create(TaskCard(text=f'fix card {number}', creator=self.user) for number in range(30))
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('tasks'), {'q': 'fix'})
+        self.assertEqual(response.context['query'], 'fix')
+        self.assertContains(response, 'name="q" value="fix"')
+        self.assertEqual(self.client.get(reverse('tasks')).context['query'], '')
 
     def test_set_executor_form(self):
         form_data = {'executor': self.user.id}
@@ -37,6 +83,50 @@ class TaskCardListViewTest(TestCase):
             self.assertFalse(User.objects.exclude(id=self.user.id).exists()) 
 
 
+class BoardEngineTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='boarduser', password='boardpass')
+        for status in TaskCard.STATUSES:
+            for number in range(4):
+                TaskCard.objects.create(text=f'{status} {number}', status=status, creator=self.user, executor=self.user)
+
+    def test_board_is_one_query(self):
+        with self.assertNumQueries(1):
+            columns = build_board(limit=3)
+            for column in columns:
+                for task in column.cards:
+                    str(task.creator), str(task.executor)
+        self.assertEqual([column.status for column in columns], list(TaskCard.STATUSES))
+        for column in columns:
+            self.assertEqual(len(column.cards), 3)
+            self.assertTrue(column.has_more)
+            self.assertTrue(all(task.status == column.status for task in column.cards))
+
+    def test_column_cursor(self):
+        first_page = build_board(limit=3)[0]
+        second_page = build_board(cursors={'New': first_page.next_cursor}, limit=3)[0]
+        self.assertEqual([task.text for task in second_page.cards], ['New 3'])
+        self.assertFalse(second_page.has_more)
+        self.assertIsNone(second_page.next_cursor)
+
+    def test_load_more_link(self):
+        self.client.force_login(self.user)
+        with mock.patch.object(TaskCardListView, 'column_limit', 3):
+            response = self.client.get(reverse('tasks'))
+            self.assertNotContains(response, 'In QA 3')
+            next_url = response.context['columns'][2].next_url
+            response = self.client.get(reverse('tasks') + next_url)
+        self.assertContains(response, 'In QA 3')
+        self.assertNotContains(response, 'In QA 0')
+
+
+    def test_malformed_cursors_are_ignored(self):
+        self.assertEqual(parse_cursors({'after_new': '9' * 30, 'after_in-qa': '²', 'after_done': '-1', 'after_ready': '42'}),
+                         {'Ready': 42})
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('tasks'), {'after_new': '9' * 30}).status_code, 200)
+
+
 class TaskCardDetailViewTest(TestCase):
     def setUp(self):
         self.user = User.objects.create_user(username='my2tuser', password='my2password')
@@ -118,6 +208,27 @@ class TaskCardModelTest(TestCase):
         self.assertEqual(task.create_at.minute, timezone.now().minute)
 
 
+class TaskCardStatusFieldTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='statususer', password='statuspassword')
+        self.task = TaskCard.objects.create(text='Coded task', status='In QA', creator=self.user)
+
+    def test_status_is_stored_as_code(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT status FROM mainapp_taskcard WHERE id = %s', [self.task.id])
+            self.assertEqual(cursor.fetchone()[0], Status.IN_QA)
+        self.assertEqual(TaskCard.objects.get(pk=self.task.pk).status, 'In QA')
+        self.assertTrue(TaskCard.objects.filter(status__in=['In QA', 'Done']).exists())
+
+    def test_api_uses_labels(self):
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(f'/api/tasks/{self.task.id}/')
+        self.assertEqual(response.json()['status'], 'In QA')
+        response = self.client.get('/api/tasks/?search=in')
+        self.assertEqual(len(response.json()['results']), 1)
+
+
 class UpperStatusTaskCardViewTest(TestCase):
     def setUp(self):
         self.user = User.objects.create_user(username='simpleuser', password='simplepassword')
@@ -168,6 +279,535 @@ class LowerStatusTaskCardViewTest(TestCase):
         self.assertEqual(updated_task.status, 'New')
 
 
+class TransitionServiceTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='mover', password='moverpassword')
+        self.task = TaskCard.objects.create(text='Moving task', status='In QA', creator=self.user, executor=self.user)
+
+    def test_step_is_one_update(self):
+        with self.assertNumQueries(1):
+            self.assertTrue(transitions.step(self.task.pk, 'upper'))
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, 'Ready')
+        with self.assertNumQueries(1):
+            self.assertTrue(transitions.step(self.task.pk, 'lower', 'Ready'))
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, 'In QA')
+
+    def test_conflict(self):
+        self.assertFalse(transitions.transition(self.task.pk, 'New', 'In progress'))
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, 'In QA')
+        self.assertFalse(transitions.step(self.task.pk, 'upper', 'In progress'))
+
+    def test_stale_board_click(self):
+        self.client.login(username='mover', password='moverpassword')
+        response = self.client.post(reverse('upper_task_status', args=[self.task.pk]), {'status': 'In progress'}, follow=True)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, 'In QA')
+        self.assertContains(response, 'The task has already been moved by someone else')
+
+    def test_missing_task(self):
+        self.client.login(username='mover', password='moverpassword')
+        response = self.client.post(reverse('upper_task_status', args=[self.task.pk + 100]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_api_transition_conflict(self):
+        serializer = TaskCardSerializer(self.task, data={'status': 'Ready'}, partial=True,
+                                        context={'request': mock.Mock(user=self.user)})
+        self.assertTrue(serializer.is_valid())
+        TaskCard.objects.filter(pk=self.task.pk).update(status='In progress')
+        with self.assertRaises(ValidationError):
+            serializer.save()
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, 'In progress')
+
+
+class BoardEventsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='watcher', password='watcherpassword')
+        self.task = TaskCard.objects.create(text='Watched task', creator=self.user)
+
+    def collect(self):
+        received = []
+
+        def listener(sender, events, **kwargs):
+            received.extend(events)
+        task_cards_changed.connect(listener)
+        self.addCleanup(task_cards_changed.disconnect, listener)
+        return received
+
+    def test_change_events(self):
+        received = self.collect()
+        with self.captureOnCommitCallbacks(execute=True):
+            task = TaskCard.objects.get(pk=self.task.pk)
+            task.executor = self.user
+            task.save()
+            transitions.transition(task.pk, 'New', 'In progress')
+            transitions.step(task.pk, 'upper')
+            TaskCard.objects.get(pk=self.task.pk).delete()
+        self.assertEqual(received, [
+            {'type': 'executor', 'id': task.pk, 'executor': self.user.pk, 'executor_name': 'watcher'},
+            {'type': 'status', 'id': task.pk, 'status': 'In progress'},
+            {'type': 'status', 'id': task.pk, 'direction': 'upper'},
+            {'type': 'delete', 'id': task.pk},
+        ])
+
+    def test_unchanged_save_is_silent(self):
+        received = self.collect()
+        with self.captureOnCommitCallbacks(execute=True):
+            TaskCard.objects.get(pk=self.task.pk).save()
+        self.assertEqual(received, [])
+
+    def test_hub_backpressure_and_connection_cap(self):
+        async def scenario():
+            hub = BroadcastHub(queue_size=2, max_connections_per_user=1)
+            subscription = hub.subscribe(self.user.pk)
+            for number in range(3):
+                hub.publish([{'type': 'update', 'id': number}])
+            await asyncio.sleep(0)
+            self.assertEqual(await subscription.queue.get(), [{'type': 'resync'}])
+            self.assertTrue(subscription.queue.empty())
+            newer = hub.subscribe(self.user.pk)
+            await asyncio.sleep(0)
+            self.assertEqual(hub.connections(self.user.pk), 1)
+            self.assertIsNone(await subscription.queue.get())
+            hub.publish([{'type': 'update', 'id': 3}])
+            await asyncio.sleep(0)
+            self.assertEqual(await newer.queue.get(), [{'type': 'update', 'id': 3}])
+        asyncio.run(scenario())
+
+    def test_stream_requires_asgi(self):
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('board_events')).status_code, 501)
+
+    async def test_stream(self):
+        await sync_to_async(self.client.force_login)(self.user)
+        self.async_client.cookies = self.client.cookies
+        response = await self.async_client.get(reverse('board_events'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b'retry: 3000\n\n')
+        hub.publish([{'type': 'delete', 'id': 7}])
+        self.assertEqual(await anext(stream), b'event: delete\ndata: {"type": "delete", "id": 7}\n\n')
+        await stream.aclose()
+
+    async def open_stream(self):
+        response = await self.async_client.get(reverse('board_events'))
+        self.assertEqual(response.status_code, 200)
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b'retry: 3000\n\n')
+        return stream
+
+    async def test_abandoned_streams_are_released(self):
+        # Nothing calls aclose() here, as under an ASGI server whose client
+        # went away: the oldest stream is closed once the user opens more
+        # than 3, and every stream ends at BOARD_EVENTS_MAX_AGE.
+        await sync_to_async(self.client.force_login)(self.user)
+        self.async_client.cookies = self.client.cookies
+        with self.settings(BOARD_EVENTS_MAX_AGE=0.2):
+            abandoned = await self.open_stream()
+            streams = [await self.open_stream() for _ in range(3)]
+            self.assertEqual(hub.connections(self.user.pk), 3)
+            self.assertEqual([chunk async for chunk in abandoned], [])
+            for stream in streams:
+                self.assertEqual([chunk async for chunk in stream], [])
+        self.assertEqual(hub.connections(self.user.pk), 0)
+
+
+class BoardCacheTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='viewer', password='viewerpassword')
+        self.task = TaskCard.objects.create(text='Cached task', creator=self.user, executor=self.user)
+        self.client.force_login(self.user)
+
+    def test_repeat_views_skip_the_board_queries(self):
+        self.assertEqual(self.client.get(reverse('tasks'))['X-Board-Cache'], 'miss')
+        hits = board_cache.stats()['hits']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('tasks'))
+        self.assertEqual(response['X-Board-Cache'], 'hit')
+        self.assertContains(response, 'Cached task')
+        # Only the ETag's aggregate over the table, not the board itself.
+        self.assertTrue(all('MAX(' in query['sql'] for query in queries if '"mainapp_taskcard"' in query['sql']))
+        self.assertEqual(board_cache.stats()['hits'], hits + 1)
+
+    def test_writes_from_other_processes_are_seen(self):
+        response = self.client.get(reverse('tasks'))
+        # queryset.update() sends no signals, like a write by another worker.
+        TaskCard.objects.filter(pk=self.task.pk).update(text='Changed elsewhere', update_at=timezone.now())
+        response = self.client.get(reverse('tasks'), HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['X-Board-Cache'], 'miss')
+        self.assertContains(response, 'Changed elsewhere')
+
+    def test_pages_are_per_viewer(self):
+        self.client.get(reverse('tasks'))
+        self.client.force_login(User.objects.create_superuser(username='boss', password='bosspassword'))
+        self.assertEqual(self.client.get(reverse('tasks'))['X-Board-Cache'], 'miss')
+
+    def test_changes_invalidate(self):
+        self.client.get(reverse('tasks'))
+        self.task.text = 'Renamed task'
+        self.task.save()
+        response = self.client.get(reverse('tasks'))
+        self.assertEqual(response['X-Board-Cache'], 'miss')
+        self.assertContains(response, 'Renamed task')
+        with self.captureOnCommitCallbacks(execute=True):
+            transitions.step(self.task.pk, 'upper')
+        self.assertEqual(self.client.get(reverse('tasks'))['X-Board-Cache'], 'miss')
+
+    def test_renamed_user(self):
+        self.client.get(reverse('tasks'))
+        self.client.login(username='viewer', password='viewerpassword')
+        self.assertEqual(board_cache.stats()['entries'], 1)
+        self.user.username = 'renamedviewer'
+        self.user.save()
+        self.assertEqual(board_cache.stats()['entries'], 0)
+        response = self.client.get(reverse('tasks'))
+        self.assertEqual(response['X-Board-Cache'], 'miss')
+        self.assertContains(response, 'renamedviewer')
+
+    def test_lru_and_ttl(self):
+        pages = BoardCache(max_entries=2, timeout=60)
+        pages.set('a', b'a')
+        pages.set('b', b'b')
+        pages.get('a')
+        pages.set('c', b'c')
+        self.assertIsNone(pages.get('b'))
+        self.assertEqual(pages.get('a'), b'a')
+        with mock.patch('mainapp.board_cache.time.monotonic', return_value=time.monotonic() + 61):
+            self.assertIsNone(pages.get('c'))
+        self.assertEqual(pages.stats(), {'hits': 2, 'misses': 2, 'entries': 1})
+
+
+class BoardCardComponentTest(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user(username='cardcreator', password='cardcreatorpassword')
+        self.executor = User.objects.create_user(username='cardexecutor', password='cardexecutorpassword')
+        self.task = TaskCard.objects.create(text='Component task', status='Ready', creator=self.creator, executor=self.executor)
+
+    def card(self, user):
+        return prepare_cards(build_board(), user)[3].cards[0]
+
+    def test_permissions_are_precomputed(self):
+        superuser = User.objects.create_superuser(username='cardroot', password='cardrootpassword')
+        self.assertEqual([(card.can_manage, card.can_move_upper, card.can_move_lower) for card in map(self.card, [self.creator, self.executor, superuser])],
+                         [(True, False, False), (False, False, True), (True, True, False)])
+        self.assertEqual(self.card(self.executor).urls['lower_task_status'], reverse('lower_task_status', kwargs={'pk': self.task.pk}))
+
+    def fragment_keys(self, secret):
+        return {card.task.pk: make_template_fragment_key('task_card', [card.version, secret])
+                for column in prepare_cards(build_board(), self.creator) for card in column.cards}
+
+    def test_unchanged_cards_are_reused(self):
+        other = TaskCard.objects.create(text='Other component task', creator=self.creator)
+        self.client.force_login(self.creator)
+        secret = self.client.get(reverse('tasks')).wsgi_request.META['CSRF_COOKIE']
+        before = self.fragment_keys(secret)
+        self.assertTrue(all(cache.has_key(key) for key in before.values()))
+        self.task.text = 'Edited component task'
+        self.task.save()
+        self.assertContains(self.client.get(reverse('tasks')), 'Edited component task')
+        after = self.fragment_keys(secret)
+        self.assertEqual(after[other.pk], before[other.pk])
+        self.assertNotEqual(after[self.task.pk], before[self.task.pk])
+
+    def test_renamed_users_are_rendered_again(self):
+        template = get_template('task_card.html')
+        context = {'csrf_secret': 'secret', 'card_cache_timeout': 300}
+        self.assertIn('cardcreator', template.render({**context, 'card': self.card(self.creator)}))
+        self.creator.username = 'renamedcreator'
+        self.creator.save()
+        self.executor.username = 'renamedexecutor'
+        self.executor.save()
+        html = template.render({**context, 'card': self.card(self.creator)})
+        self.assertIn('renamedcreator', html)
+        self.assertIn('renamedexecutor', html)
+
+
+@override_settings(REQUEST_METRICS_TOKEN='scraper-token')
+class RequestMetricsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='viewer', password='viewerpassword')
+        self.client.force_login(self.user)
+        self.registry = RequestMetrics()
+        for target in ('mainapp.middleware.registry', 'mainapp.views.registry'):
+            patcher = mock.patch(target, self.registry)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_requests_are_recorded_per_view(self):
+        self.client.get(reverse('tasks'))
+        self.client.get('/no-such-page/')
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scraper-token')
+        self.assertEqual(response['Content-Type'], 'text/plain; version=0.0.4; charset=utf-8')
+        body = response.content.decode()
+        self.assertIn('http_requests_total{view="tasks",method="GET",status="200"} 1', body)
+        self.assertIn('http_requests_total{view="unmatched",method="GET",status="404"} 1', body)
+        self.assertIn('http_request_duration_seconds_bucket{view="tasks",method="GET",le="+Inf"} 1', body)
+        self.assertIn('db_queries_per_request_count{view="tasks"} 1', body)
+        self.assertIn('board_cache_misses_total', body)
+
+    async def test_async_views_are_measured(self):
+        token = await Token.objects.acreate(user=self.user)
+        response = await self.async_client.get(reverse('async_task_list'), headers={'authorization': f'Token {token.key}'})
+        self.assertEqual(response.status_code, 200)
+        body = self.registry.render()
+        self.assertIn('db_queries_per_request_count{view="async_task_list"} 1', body)
+        self.assertNotIn('db_queries_per_request_sum{view="async_task_list"} 0', body)
+
+    @override_settings(DEBUG=True, SLOW_QUERY_ENABLED=True, TRAFFIC_CAPTURE_ENABLED=True,
+                       REQUEST_PROFILING_ENABLED=True, REQUEST_METRICS_ENABLED=True)
+    def test_async_chain_is_not_adapted(self):
+        handler = ASGIHandler()
+        with self.assertLogs('django.request', 'DEBUG') as logs:
+            handler.load_middleware(is_async=True)
+            logging.getLogger('django.request').debug('Middleware loaded')
+        self.assertEqual([line for line in logs.output if 'adapted' in line], [])
+        self.assertTrue(iscoroutinefunction(handler._middleware_chain))
+
+    def test_repeated_query_shapes(self):
+        self.assertEqual(normalize_sql("SELECT 1 FROM t WHERE a IN (%s, %s) AND b = 'x' LIMIT 21"),
+                         'SELECT ? FROM t WHERE a IN (...) AND b = ? LIMIT ?')
+        recorder = QueryRecorder()
+        with connection.execute_wrapper(recorder):
+            for pk in range(3):
+                list(TaskCard.objects.filter(pk__in=range(pk + 1)))
+            User.objects.count()
+        self.assertEqual(recorder.count, 4)
+        self.assertEqual(list(recorder.repeated(3).values()), [3])
+        self.registry.observe('tasks', 'GET', 200, 0.01, recorder, 3)
+        self.assertIn('db_repeated_query_requests_total{view="tasks",query="SELECT', self.registry.render())
+
+    def test_access_and_toggle(self):
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.1').status_code, 403)
+        # Behind a local reverse proxy every request comes from 127.0.0.1.
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='127.0.0.1').status_code, 403)
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer guess').status_code, 403)
+        with override_settings(REQUEST_METRICS_ALLOW_INTERNAL_IPS=True):
+            self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='127.0.0.1').status_code, 200)
+        with override_settings(REQUEST_METRICS_TOKEN=''):
+            self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer ').status_code, 403)
+        with override_settings(REQUEST_METRICS_ENABLED=False):
+            # The middleware is left out when a client loads it.
+            client = self.client_class()
+            client.force_login(self.user)
+            self.assertEqual(client.get(reverse('metrics')).status_code, 404)
+            client.get(reverse('tasks'))
+        self.assertNotIn('view="tasks"', self.registry.render())
+
+
+class RequestProfilingTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='viewer', password='viewerpassword')
+        self.boss = User.objects.create_superuser(username='boss', password='bosspassword')
+        TaskCard.objects.create(text='Profiled task', creator=self.user)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        patcher = override_settings(REQUEST_PROFILING_DIR=self.directory, REQUEST_PROFILING_TOKEN='secret')
+        patcher.enable()
+        self.addCleanup(patcher.disable)
+
+    def test_superuser_header_profiles_one_request(self):
+        self.client.force_login(self.boss)
+        self.assertNotIn('X-Profile', self.client.get(reverse('aboutpage')))
+        name = self.client.get(reverse('tasks'), HTTP_X_PROFILE='1')['X-Profile']
+        self.assertGreater(pstats.Stats(os.path.join(self.directory, f'{name}.pstats')).total_calls, 0)
+        self.assertTrue(os.path.exists(os.path.join(self.directory, f'{name}.collapsed')))
+        with open(os.path.join(self.directory, f'{name}.json')) as summary_file:
+            summary = json.load(summary_file)
+        self.assertEqual((summary['view'], summary['status'], summary['user']), ('tasks', 200, 'boss'))
+        self.assertEqual(summary['queries'], len(summary['statements']))
+        self.assertTrue(any('mainapp_taskcard' in statement['sql'] for statement in summary['statements']))
+
+    def test_token_and_sample_rate(self):
+        self.client.force_login(self.user)
+        self.assertNotIn('X-Profile', self.client.get(reverse('tasks'), HTTP_X_PROFILE='guess'))
+        self.assertIn('X-Profile', self.client.get(reverse('tasks'), HTTP_X_PROFILE='secret'))
+        with override_settings(REQUEST_PROFILING_SAMPLE_RATE=1.0):
+            self.assertIn('X-Profile', self.client.get('/api/tasks/'))
+
+    def test_secrets_are_not_written(self):
+        token = Token.objects.create(user=self.user)
+        self.client.force_login(self.user)
+        session_key = self.client.session.session_key
+        name = self.client.get('/api/tasks/', HTTP_X_PROFILE='secret', HTTP_AUTHORIZATION=f'Token {token.key}')['X-Profile']
+        with open(os.path.join(self.directory, f'{name}.json')) as summary_file:
+            content = summary_file.read()
+        self.assertIn('authtoken_token', content)
+        self.assertNotIn(token.key, content)
+        self.assertNotIn(session_key, content)
+        self.assertNotIn(self.user.password, content)
+
+    def test_failed_save_does_not_fail_the_request(self):
+        self.client.force_login(self.boss)
+        with mock.patch('mainapp.profiling.RequestProfile.save', side_effect=OSError('disk full')), \
+                self.assertLogs('mainapp.profiling', 'ERROR'):
+            response = self.client.get(reverse('tasks'), HTTP_X_PROFILE='1')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('X-Profile', response)
+
+    def test_rotation_and_profile_pages(self):
+        self.client.force_login(self.boss)
+        with override_settings(REQUEST_PROFILING_KEEP=2):
+            names = [self.client.get(reverse('aboutpage'), HTTP_X_PROFILE='1')['X-Profile'] for _ in range(3)]
+        response = self.client.get(reverse('profiles'))
+        self.assertEqual([profile['name'] for profile in response.context['profiles']], names[:0:-1])
+        self.assertEqual(self.client.get(reverse('profile_file', args=[names[-1], 'collapsed'])).status_code, 200)
+        self.assertEqual(self.client.get(reverse('profile_file', args=[names[0], 'pstats'])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('profile_file', args=['..', 'sql'])).status_code, 404)
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse('profiles')).status_code, 403)
+
+
+@override_settings(SLOW_QUERY_ENABLED=True)
+class SlowQueryLogTest(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.log = os.path.join(directory.name, 'slow.jsonl')
+
+    def read_log(self):
+        with open(self.log) as log:
+            return [json.loads(line) for line in log]
+
+    def test_slow_statements_are_logged_with_view_location_and_plan(self):
+        user = User.objects.create_user(username='viewer', password='viewerpassword')
+        task = TaskCard.objects.create(text='Slow task', creator=user)
+        self.client.force_login(user)
+        with override_settings(SLOW_QUERY_LOG=self.log, SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_EXPLAIN=True):
+            self.client.get(reverse('task_detail', kwargs={'pk': task.pk}))
+        entries = self.read_log()
+        self.assertTrue(entries)
+        self.assertEqual({entry['view'] for entry in entries}, {'task_detail'})
+        self.assertTrue(any('django_session' in entry['shape'] for entry in entries))
+        card = next(entry for entry in entries if entry['location'] and entry['location'].startswith('mainapp/views.py'))
+        self.assertIn('mainapp_taskcard', card['sql'])
+        self.assertTrue(any(entry['plan'] and 'mainapp_taskcard' in entry['plan'] for entry in entries))
+
+    def test_fast_statements_are_not_logged(self):
+        self.client.force_login(User.objects.create_user(username='viewer', password='viewerpassword'))
+        with override_settings(SLOW_QUERY_LOG=self.log, SLOW_QUERY_THRESHOLD_MS=10000):
+            self.client.get(reverse('tasks'))
+        self.assertFalse(os.path.exists(self.log))
+
+    def test_report_ranks_shapes(self):
+        with open(self.log, 'w') as log:
+            for ms, sql in ((50, 'SELECT a FROM t WHERE id = 1'), (50, 'SELECT a FROM t WHERE id = 2'), (80, 'SELECT b FROM u')):
+                log.write(json.dumps({'at': '2026-01-01T00:00:00', 'ms': ms, 'shape': normalize_sql(sql), 'sql': sql,
+                                      'view': 'tasks', 'location': 'mainapp/views.py:1 in get', 'plan': None}) + '\n')
+        out = io.StringIO()
+        call_command('slow_queries', '--log', self.log, stdout=out)
+        report = out.getvalue()
+        self.assertLess(report.index('SELECT a FROM t WHERE id = ?'), report.index('SELECT b FROM u'))
+        self.assertIn('#1 2x, total 100 ms', report)
+        out = io.StringIO()
+        call_command('slow_queries', '--log', self.log, '--by', 'max', stdout=out)
+        self.assertLess(out.getvalue().index('SELECT b FROM u'), out.getvalue().index('SELECT a FROM t'))
+
+
+class TrafficReplayTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='viewer', password='viewerpassword')
+        self.token = Token.objects.create(user=self.user)
+        self.task = TaskCard.objects.create(text='Replayed task', creator=self.user)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.capture = os.path.join(self.directory, 'requests.jsonl')
+
+    def record_traffic(self):
+        with override_settings(TRAFFIC_CAPTURE_ENABLED=True, TRAFFIC_CAPTURE_FILE=self.capture):
+            client = self.client_class()
+            client.force_login(self.user)
+            client.get(reverse('tasks'), {'ready': 1})
+            client.get('/metrics')
+            api = self.client_class()
+            api.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+            api.patch(f'/api/tasks/{self.task.pk}/', {'text': 'Renamed', 'password': 'hunter2'}, format='json')
+        return list(read_capture(self.capture))
+
+    def test_requests_are_recorded_without_secrets(self):
+        board, update = self.record_traffic()
+        self.assertEqual((board['method'], board['path'], board['query'], board['auth'], board['user'], board['status']),
+                         ('GET', '/tasklist/', 'ready=1', 'session', 'viewer', 200))
+        self.assertIsNone(board['body'])
+        self.assertEqual((update['auth'], update['user'], update['content_type']), ('token', 'viewer', 'application/json'))
+        self.assertEqual(json.loads(update['body']), {'text': 'Renamed', 'password': '[redacted]'})
+        self.assertNotIn(self.token.key, open(self.capture).read())
+
+    def test_replay_reports_and_compares(self):
+        self.record_traffic()
+        output = os.path.join(self.directory, 'first.json')
+        call_command('replay', self.capture, '--speed', '0', '--concurrency', '1', '--host', 'testserver', '--output', output, stdout=io.StringIO())
+        with open(output) as report_file:
+            report = json.load(report_file)
+        self.assertEqual((report['requests'], report['skipped'], report['statuses']), (2, 0, {'200': 2}))
+        self.assertEqual(set(report['routes']), {'GET tasks', 'PATCH taskcard-detail'})
+        out = io.StringIO()
+        call_command('replay', self.capture, '--speed', '0', '--concurrency', '1', '--host', 'testserver', '--read-only', '--baseline', output, stdout=out)
+        report = json.loads(out.getvalue())
+        self.assertEqual(set(report['routes']), {'GET tasks'})
+        self.assertIn('GET tasks', report['change']['routes'])
+        with self.assertRaises(CommandError):
+            call_command('replay', os.path.join(self.directory, 'missing.jsonl'), stdout=io.StringIO())
+
+
+    def test_replay_is_not_captured_again(self):
+        self.record_traffic()
+        size = os.path.getsize(self.capture)
+        with override_settings(TRAFFIC_CAPTURE_ENABLED=True, TRAFFIC_CAPTURE_FILE=self.capture):
+            call_command('replay', self.capture, '--speed', '0', '--concurrency', '1', '--host', 'testserver', stdout=io.StringIO())
+        self.assertEqual(os.path.getsize(self.capture), size)
+
+
+class AsyncTaskCardAPITest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='asyncuser', password='asyncpassword')
+        self.headers = {'authorization': f'Token {Token.objects.create(user=self.user).key}'}
+        self.tasks = [TaskCard.objects.create(text=f'Async task {number}', creator=self.user, executor=self.user) for number in range(3)]
+
+    async def test_requires_token(self):
+        response = await self.async_client.get(reverse('async_task_list'))
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.get(reverse('async_task_list'), headers={'authorization': 'Token nope'})
+        self.assertEqual(response.status_code, 401)
+
+    async def test_list_pages_and_etag(self):
+        url = reverse('async_task_list')
+        response = await self.async_client.get(url, {'page_size': 2}, headers=self.headers)
+        self.assertEqual([task['id'] for task in response.json()['results']], [self.tasks[2].pk, self.tasks[1].pk])
+        next_page = await self.async_client.get(response.json()['next'], headers=self.headers)
+        self.assertEqual([task['id'] for task in next_page.json()['results']], [self.tasks[0].pk])
+        self.assertIsNone(next_page.json()['next'])
+        repeat = await self.async_client.get(url, {'page_size': 2}, headers={**self.headers, 'if-none-match': response['ETag']})
+        self.assertEqual(repeat.status_code, 304)
+
+    async def test_detail_matches_sync_api(self):
+        response = await self.async_client.get(reverse('async_task_detail', args=[self.tasks[0].pk]), headers=self.headers)
+        self.assertEqual(response.json(), TaskCardSerializer(self.tasks[0]).data)
+        response = await self.async_client.get(reverse('async_task_detail', args=[0]), headers=self.headers)
+        self.assertEqual(response.status_code, 404)
+
+    async def test_status_transition(self):
+        url = reverse('async_task_status', args=[self.tasks[0].pk])
+        response = await self.async_client.post(url, {'status': 'In progress'}, content_type='application/json', headers=self.headers)
+        self.assertEqual(response.json()['status'], 'In progress')
+        self.assertEqual((await TaskCard.objects.aget(pk=self.tasks[0].pk)).status, 'In progress')
+        response = await self.async_client.post(url, {'status': 'Done'}, content_type='application/json', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), ['There is no such option to switch between statuses'])
+
+    async def test_status_conflict(self):
+        url = reverse('async_task_status', args=[self.tasks[0].pk])
+        with mock.patch.object(transitions, 'atransition', mock.AsyncMock(return_value=False)):
+            response = await self.async_client.post(url, {'status': 'In progress'}, content_type='application/json', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), ['The task status has been changed by someone else'])
+
+
 class SetExecutorViewTest(TestCase):
     def setUp(self):
         self.user = User.objects.create_user(username='future_executor', password='executorpass')
@@ -184,6 +824,38 @@ class SetExecutorViewTest(TestCase):
         self.assertEqual(self.task.executor, self.user)  
 
         
+class ExecutorLookupViewTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.superuser = User.objects.create_superuser(username='boss', password='bosspassword')
+        self.user = User.objects.create_user(username='anna', password='annapassword')
+        for number in range(25):
+            User.objects.create_user(username=f'worker{number:02}', password='workerpassword')
+
+    def test_prefix_search_is_paginated(self):
+        self.client.force_login(self.superuser)
+        response = self.client.get(reverse('executor_lookup'), {'q': 'worker'})
+        page = response.json()
+        self.assertEqual(len(page['results']), 20)
+        self.assertEqual(page['next'], 'worker19')
+        response = self.client.get(reverse('executor_lookup'), {'q': 'worker', 'after': page['next']})
+        page = response.json()
+        self.assertEqual([user['username'] for user in page['results']], [f'worker{number}' for number in range(20, 25)])
+        self.assertIsNone(page['next'])
+
+    def test_cached_page(self):
+        self.client.force_login(self.superuser)
+        self.client.get(reverse('executor_lookup'), {'q': 'an'})
+        User.objects.create_user(username='andrew', password='andrewpassword')
+        response = self.client.get(reverse('executor_lookup'), {'q': 'an'})
+        self.assertEqual([user['username'] for user in response.json()['results']], ['anna'])
+
+    def test_regular_user_sees_only_self(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('executor_lookup'))
+        self.assertEqual(response.json()['results'], [{'id': self.user.id, 'username': 'anna'}])
+
+
 class TaskCardModelViewSetTest(APITestCase):
     def setUp(self):
         self.client = APIClient()
@@ -264,6 +936,321 @@ class TaskCardModelViewSetTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
+class TaskCardBulkTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='bulkuser', password='bulkpassword')
+        self.other = User.objects.create_user(username='bulkother', password='bulkotherpassword')
+        self.task = TaskCard.objects.create(text='Bulk task', creator=self.user, executor=self.user)
+        self.foreign_task = TaskCard.objects.create(text='Foreign task', creator=self.other)
+
+    def test_bulk_apply(self):
+        self.client.force_authenticate(user=self.user)
+        operations = [
+            {'op': 'create', 'text': 'first'},
+            {'op': 'create', 'text': 'second'},
+            {'op': 'update', 'id': self.task.id, 'text': 'Bulk task edited'},
+            {'op': 'transition', 'id': self.task.id, 'status': 'In progress'},
+            {'op': 'transition', 'id': self.task.id, 'status': 'In QA'},
+            {'op': 'assign', 'id': self.task.id, 'executor': self.user.id},
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/tasks/bulk/', operations, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertLessEqual(len(queries), 6)
+        results = response.data['results']
+        self.assertEqual([result['index'] for result in results], list(range(6)))
+        self.assertEqual(TaskCard.objects.get(id=results[0]['id']).text, 'first')
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.text, 'Bulk task edited')
+        self.assertEqual(self.task.status, 'In QA')
+
+    def test_bulk_is_all_or_nothing(self):
+        self.client.force_authenticate(user=self.user)
+        operations = [
+            {'op': 'create', 'text': 'never stored'},
+            {'op': 'update', 'id': self.foreign_task.id, 'text': 'not mine'},
+            {'op': 'transition', 'id': self.task.id, 'status': 'Done'},
+            {'op': 'delete', 'id': self.task.id},
+        ]
+        response = self.client.post('/api/tasks/bulk/', operations, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([error['index'] for error in response.data['errors']], [1, 2, 3])
+        self.assertFalse(TaskCard.objects.filter(text='never stored').exists())
+
+    def test_bulk_rejects_ids_that_are_not_integers(self):
+        self.client.force_authenticate(user=self.user)
+        operations = [{'op': 'update', 'id': value, 'text': 'edited'} for value in ([self.task.id], {}, True, str(self.task.id))]
+        response = self.client.post('/api/tasks/bulk/', operations, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([error['errors'] for error in response.data['errors']], [{'id': ['No such task']}] * 4)
+
+    def test_bulk_create_requires_text(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post('/api/tasks/bulk/', [{'op': 'create'}], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('text', response.data['errors'][0]['errors'])
+        response = self.client.post('/api/tasks/', {}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('text', response.data)
+
+    def test_bulk_requires_authentication(self):
+        response = self.client.post('/api/tasks/bulk/', [], format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class TaskCardFullTextSearchTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='finder', password='finderpassword')
+        self.login_task = TaskCard.objects.create(text='Fix the login page', creator=self.user)
+        self.both_task = TaskCard.objects.create(text='Login page timeout breaks the login form', creator=self.user)
+        TaskCard.objects.create(text='Paint the fence', creator=self.user)
+
+    def test_ranked_search(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/api/tasks/', {'q': 'login'})
+        self.assertEqual([task['id'] for task in response.data['results']], [self.both_task.id, self.login_task.id])
+
+    def test_search_pages(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/api/tasks/', {'q': 'login', 'page_size': 1})
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNone(response.data['previous'])
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNone(response.data['next'])
+        self.assertIsNotNone(response.data['previous'])
+
+    def test_index_follows_updates(self):
+        self.client.force_authenticate(user=self.user)
+        TaskCard.objects.filter(pk=self.login_task.pk).update(text='Renamed to signin')
+        response = self.client.get('/api/tasks/', {'q': 'signin "quoted'})
+        self.assertEqual(response.data['results'], [])
+        response = self.client.get('/api/tasks/', {'q': 'signin'})
+        self.assertEqual([task['id'] for task in response.data['results']], [self.login_task.id])
+        self.login_task.delete()
+        response = self.client.get('/api/tasks/', {'q': 'signin'})
+        self.assertEqual(response.data['results'], [])
+
+    def test_board_search(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('tasks'), {'q': 'fence'})
+        self.assertContains(response, 'Paint the fence')
+        self.assertNotContains(response, 'Fix the login page')
+
+
+class ConditionalGetTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='poller', password='pollerpassword')
+        self.task = TaskCard.objects.create(text='Polled task', creator=self.user)
+        self.other_task = TaskCard.objects.create(text='Other polled task', creator=self.user)
+
+    def assertNotModified(self, url, **extra):
+        response = self.client.get(url, **extra)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('Last-Modified', response)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'], **extra)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        return response['ETag']
+
+    def test_api_list(self):
+        self.client.force_authenticate(user=self.user)
+        etag = self.assertNotModified('/api/tasks/')
+        self.task.text = 'Changed'
+        self.task.save()
+        self.assertEqual(self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+        etag = self.assertNotModified('/api/tasks/')
+        self.other_task.delete()
+        self.assertEqual(self.client.get('/api/tasks/', HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_api_list_card_leaves_the_filter(self):
+        self.client.force_authenticate(user=self.user)
+        etag = self.assertNotModified('/api/tasks/?search=New')
+        transitions.step(self.task.pk, 'upper')
+        response = self.client.get('/api/tasks/?search=New', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_api_detail(self):
+        self.client.force_authenticate(user=self.user)
+        etag = self.assertNotModified(f'/api/tasks/{self.task.pk}/')
+        transitions.step(self.task.pk, 'upper')
+        response = self.client.get(f'/api/tasks/{self.task.pk}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.data['status'], 'In progress')
+
+    def test_html_views(self):
+        self.client.force_login(self.user)
+        self.assertNotModified(reverse('task_detail', kwargs={'pk': self.task.pk}))
+        etag = self.assertNotModified(reverse('tasks'))
+        self.client.force_login(User.objects.create_superuser(username='root', password='rootpassword'))
+        self.assertEqual(self.client.get(reverse('tasks'), HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_renamed_user(self):
+        self.client.force_authenticate(user=self.user)
+        self.client.force_login(self.user)
+        urls = ['/api/tasks/', f'/api/tasks/{self.task.pk}/', reverse('task_detail', kwargs={'pk': self.task.pk})]
+        etags = {url: self.assertNotModified(url) for url in urls}
+        # Logging in only saves last_login.
+        self.client.login(username='poller', password='pollerpassword')
+        for url in urls:
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etags[url]).status_code, status.HTTP_304_NOT_MODIFIED)
+        self.user.username = 'renamed'
+        self.user.save()
+        for url in urls:
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etags[url]).status_code, status.HTTP_200_OK)
+        self.assertContains(self.client.get(urls[2]), 'renamed')
+
+
+class TaskCardExportTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='exporter', password='exporterpassword')
+        self.client.force_authenticate(user=self.user)
+        self.first = TaskCard.objects.create(text='Exported, with "quotes"', creator=self.user, executor=self.user)
+        self.second = TaskCard.objects.create(text='Second export', status='Done', creator=self.user)
+
+    def read(self, response):
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv(self):
+        content = self.read(self.client.get('/api/tasks/export/'))
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(rows[0], ['id', 'text', 'status', 'creator', 'executor', 'create_at', 'update_at'])
+        self.assertEqual(rows[1][:5], [str(self.first.pk), 'Exported, with "quotes"', 'New', str(self.user.pk), str(self.user.pk)])
+        self.assertEqual(rows[2][4], '')
+
+    def test_ndjson_filters(self):
+        content = self.read(self.client.get('/api/tasks/export/', {'output': 'ndjson', 'status': 'Done'}))
+        self.assertEqual([json.loads(line)['id'] for line in content.splitlines()], [self.second.pk])
+        content = self.read(self.client.get('/api/tasks/export/', {'output': 'ndjson', 'executor': self.user.pk, 'created_after': '2000-01-01'}))
+        self.assertEqual([json.loads(line)['id'] for line in content.splitlines()], [self.first.pk])
+        tomorrow = (timezone.now() + timezone.timedelta(days=1)).date().isoformat()
+        self.assertEqual(self.read(self.client.get('/api/tasks/export/', {'output': 'ndjson', 'created_after': tomorrow})), '')
+
+    def test_invalid_filters(self):
+        self.assertEqual(self.client.get('/api/tasks/export/', {'status': 'Lost'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.client.get('/api/tasks/export/', {'output': 'xml'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.client.force_authenticate(user=None)
+        self.assertEqual(self.client.get('/api/tasks/export/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_command(self):
+        stdout = io.StringIO()
+        call_command('export_tasks', '--output', 'ndjson', '--status', 'Done', stdout=stdout)
+        self.assertEqual([json.loads(line)['text'] for line in stdout.getvalue().splitlines()], ['Second export'])
+        with self.assertRaises(CommandError):
+            call_command('export_tasks', '--created-before', 'soon')
+
+    async def test_streams_under_asgi(self):
+        token = await Token.objects.acreate(user=self.user)
+        response = await self.async_client.get('/api/tasks/export/', {'output': 'ndjson'}, headers={'authorization': f'Token {token.key}'})
+        lines = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(len(b''.join(lines).splitlines()), 2)
+
+
+class ImportTasksCommandTestCase(TestCase):
+    def setUp(self):
+        self.creator = User.objects.create_user(username='importer', password='importerpassword')
+        self.executor = User.objects.create_user(username='assignee', password='assigneepassword')
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w') as source:
+            source.write(content)
+        return path
+
+    def test_csv(self):
+        path = self.write('tasks.csv', 'text,status,creator,executor\nFirst import,In QA,importer,assignee\n"Second, import",,assignee,\n')
+        received = []
+        task_cards_changed.connect(lambda sender, events, **kwargs: received.extend(events), weak=False, dispatch_uid='import_test')
+        self.addCleanup(task_cards_changed.disconnect, dispatch_uid='import_test')
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('import_tasks', path, stdout=io.StringIO())
+        self.assertEqual(list(TaskCard.objects.order_by('id').values_list('text', 'status', 'creator__username', 'executor__username')),
+                         [('First import', 'In QA', 'importer', 'assignee'), ('Second, import', 'New', 'assignee', None)])
+        self.assertEqual(received, [{'type': 'resync'}])
+
+    def test_resume_from_checkpoint(self):
+        lines = [json.dumps({'text': f'Imported {number}', 'creator': 'importer'}) for number in range(5)]
+        lines[3] = json.dumps({'text': 'Imported 3', 'creator': 'nobody'})
+        path = self.write('tasks.ndjson', '\n'.join(lines))
+        checkpoint = os.path.join(self.directory.name, 'tasks.checkpoint')
+        with self.assertRaisesMessage(CommandError, "record 4: unknown creator 'nobody'"):
+            call_command('import_tasks', path, '--batch-size', '2', '--checkpoint', checkpoint, stdout=io.StringIO())
+        self.assertEqual(TaskCard.objects.count(), 2)
+        lines[3] = json.dumps({'text': 'Imported 3', 'creator': 'importer'})
+        self.write('tasks.ndjson', '\n'.join(lines))
+        stdout = io.StringIO()
+        call_command('import_tasks', path, '--batch-size', '2', '--checkpoint', checkpoint, stdout=stdout)
+        self.assertIn('Resuming after record 2', stdout.getvalue())
+        self.assertIn('rows/s', stdout.getvalue())
+        self.assertEqual(list(TaskCard.objects.order_by('id').values_list('text', flat=True)), [f'Imported {number}' for number in range(5)])
+
+
+    def test_copy_writes_nulls_unquoted(self):
+        written = []
+        with mock.patch('mainapp.imports.connection') as fake:
+            raw = fake.cursor.return_value.__enter__.return_value.cursor
+            raw.copy_expert.side_effect = lambda sql, buffer: written.append(buffer.getvalue())
+            imports._copy([(None, 'New', 1, None), ('Say "hi"', 'In QA', 1, 2), ('', 'New', 1, None)], 'now')
+        self.assertEqual(written[0].splitlines(), [
+            ',"1","1",,"now","now"',
+            '"Say ""hi""","3","1","2","now","now"',
+            '"","1","1",,"now","now"',
+        ])
+
+
+class SyncFeedTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='syncer', password='syncerpassword')
+        self.client.force_authenticate(user=self.user)
+        self.first = TaskCard.objects.create(text='First synced', creator=self.user)
+        self.second = TaskCard.objects.create(text='Second synced', creator=self.user)
+        self.clock = mock.patch('mainapp.sync.SETTLE_DELAY', timezone.timedelta(0))
+        self.clock.start()
+        self.addCleanup(self.clock.stop)
+
+    def test_initial_sync_pages(self):
+        response = self.client.get('/api/tasks/sync/', {'limit': 1})
+        self.assertEqual([card['id'] for card in response.data['changes']], [self.first.id])
+        self.assertTrue(response.data['has_more'])
+        response = self.client.get('/api/tasks/sync/', {'limit': 1, 'since': response.data['cursor']})
+        self.assertEqual([card['id'] for card in response.data['changes']], [self.second.id])
+        self.assertEqual(response.data['changes'][0]['text'], 'Second synced')
+
+    def test_changes_and_tombstones(self):
+        cursor = self.client.get('/api/tasks/sync/').data['cursor']
+        self.first.text = 'First edited'
+        self.first.save()
+        self.client.delete(f'/api/tasks/{self.second.id}/')
+        response = self.client.get('/api/tasks/sync/', {'since': cursor})
+        self.assertEqual([card['text'] for card in response.data['changes']], ['First edited'])
+        self.assertEqual(response.data['deleted'], [self.second.id])
+        self.assertFalse(response.data['has_more'])
+
+    def test_caught_up_client_costs_one_query(self):
+        cursor = self.client.get('/api/tasks/sync/').data['cursor']
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/tasks/sync/', {'since': cursor})
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(response.data, {'changes': [], 'deleted': [], 'cursor': cursor, 'has_more': False})
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/tasks/sync/', {'since': 'yesterday'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_out_of_range_cursor(self):
+        for since in ('99999999999999999999999-1', '1-99999999999999999999999'):
+            response = self.client.get('/api/tasks/sync/', {'since': since})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    async def test_out_of_range_async_list_cursor(self):
+        token = await Token.objects.acreate(user=self.user)
+        response = await self.async_client.get(reverse('async_task_list'), {'cursor': '99999999999999999999999-1'},
+                                               headers={'authorization': f'Token {token.key}'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
 class TaskCardSearchTestCase(APITestCase):
     def setUp(self):
         self.user1 = User.objects.create_user(username='user1', password='user1password')
@@ -277,13 +1264,156 @@ class TaskCardSearchTestCase(APITestCase):
         self.client.force_authenticate(user=self.user1)
         response = self.client.get('/api/tasks/?search=Ready')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2) 
-        for task in response.data:
+        self.assertEqual(len(response.data['results']), 2) 
+        for task in response.data['results']:
             self.assertNotIn('text', task)
             self.assertNotIn('status', task)
         response = self.client.get('/api/tasks/?search=New')
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 0)
+        self.assertEqual(len(response.data['results']), 0)
+
+    def test_search_is_paginated(self):
+        self.client.force_authenticate(user=self.user1)
+        response = self.client.get('/api/tasks/?search=Ready&page_size=1')
+        self.assertEqual(len(response.data['results']), 1)
+        response = self.client.get(response.data['next'])
+        self.assertEqual(len(response.data['results']), 1)
+        self.assertIsNone(response.data['next'])
+
+
+class TaskCardPaginationTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='pager', password='pagerpassword')
+        TaskCard.objects.bulk_create(TaskCard(text=f'card {number}', creator=self.user) for number in range(250))
+
+    def test_pages_are_bounded_and_stable(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/api/tasks/?page_size=1000')
+        self.assertEqual(len(response.data['results']), 200)
+        seen = [task['id'] for task in response.data['results']]
+        TaskCard.objects.create(text='inserted meanwhile', creator=self.user)
+        response = self.client.get(response.data['next'])
+        seen += [task['id'] for task in response.data['results']]
+        self.assertIsNone(response.data['next'])
+        self.assertEqual(len(seen), 250)
+        self.assertEqual(len(set(seen)), 250)
+
+    def test_no_count_query(self):
+        self.client.force_authenticate(user=self.user)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/tasks/')
+        self.assertFalse(any('COUNT(' in query['sql'].upper() for query in queries.captured_queries))
+
+
+class TaskCardSparseFieldsTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='sparse', password='sparsepassword')
+        self.tasks = [TaskCard.objects.create(text=f'long body {number} ' * 100, creator=self.user) for number in range(3)]
+        self.client.force_authenticate(user=self.user)
+
+    def text_selected(self, queries):
+        return any('"mainapp_taskcard"."text"' in query['sql'] for query in queries.captured_queries)
+
+    def test_list_trims_output_and_select(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/tasks/', {'fields': 'id,status', 'page_size': 2})
+        self.assertEqual(response.data['results'], [{'id': self.tasks[2].pk, 'status': 'New'}, {'id': self.tasks[1].pk, 'status': 'New'}])
+        self.assertFalse(self.text_selected(queries))
+        response = self.client.get(response.data['next'])
+        self.assertEqual(response.data['results'], [{'id': self.tasks[0].pk, 'status': 'New'}])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/tasks/')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'text', 'status', 'creator', 'executor', 'create_at'})
+        self.assertTrue(self.text_selected(queries))
+
+    def test_retrieve_and_search_serializer(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f'/api/tasks/{self.tasks[0].pk}/', {'fields': 'creator'})
+        self.assertEqual(response.data, {'creator': self.user.pk})
+        self.assertIn('ETag', response)
+        self.assertFalse(self.text_selected(queries))
+        response = self.client.get('/api/tasks/', {'search': 'new', 'fields': 'update_at'})
+        self.assertEqual(set(response.data['results'][0]), {'update_at'})
+
+    def test_unknown_fields(self):
+        response = self.client.get('/api/tasks/', {'fields': 'id,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.data['fields'][0])
+        self.assertEqual(self.client.get('/api/tasks/', {'fields': ''}).status_code, 400)
+
+    async def test_async_endpoints(self):
+        headers = {'authorization': f'Token {(await Token.objects.acreate(user=self.user)).key}'}
+        response = await self.async_client.get(reverse('async_task_list'), {'fields': 'id'}, headers=headers)
+        self.assertEqual(response.json()['results'], [{'id': task.pk} for task in reversed(self.tasks)])
+        response = await self.async_client.get(reverse('async_task_detail', args=[self.tasks[0].pk]), {'fields': 'text'}, headers=headers)
+        self.assertEqual(response.json(), {'text': self.tasks[0].text})
+        response = await self.async_client.get(reverse('async_task_list'), {'fields': 'nope'}, headers=headers)
+        self.assertEqual(response.status_code, 400)
+
+
+class TaskCardExpandTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', first_name='Olga', password='ownerpassword')
+        self.worker = User.objects.create_user(username='worker', password='workerpassword')
+        self.tasks = [TaskCard.objects.create(text=f'Expanded {number}', creator=self.user, executor=executor)
+                      for number, executor in enumerate([self.worker, None, self.user])]
+        self.client.force_authenticate(user=self.user)
+
+    def test_list_side_table_without_extra_queries(self):
+        with CaptureQueriesContext(connection) as plain:
+            self.client.get('/api/tasks/')
+        with CaptureQueriesContext(connection) as expanded:
+            response = self.client.get('/api/tasks/', {'expand': 'creator,executor'})
+        self.assertEqual(len(expanded), len(plain))
+        self.assertNotIn('password', expanded.captured_queries[-1]['sql'])
+        self.assertEqual(response.data['users'], {
+            str(self.user.pk): {'id': self.user.pk, 'username': 'owner', 'first_name': 'Olga', 'last_name': ''},
+            str(self.worker.pk): {'id': self.worker.pk, 'username': 'worker', 'first_name': '', 'last_name': ''},
+        })
+        self.assertEqual([task['executor'] for task in response.data['results']], [self.user.pk, None, self.worker.pk])
+
+    def test_retrieve_with_fields_and_bad_relation(self):
+        response = self.client.get(f'/api/tasks/{self.tasks[1].pk}/', {'expand': 'executor,creator', 'fields': 'id,creator'})
+        self.assertEqual(response.data, {'id': self.tasks[1].pk, 'creator': self.user.pk,
+                                         'users': {str(self.user.pk): {'id': self.user.pk, 'username': 'owner', 'first_name': 'Olga', 'last_name': ''}}})
+        response = self.client.get('/api/tasks/', {'expand': 'creator,text'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('text', response.data['expand'][0])
+
+    async def test_async_endpoints(self):
+        headers = {'authorization': f'Token {(await Token.objects.acreate(user=self.user)).key}'}
+        response = await self.async_client.get(reverse('async_task_list'), {'expand': 'executor'}, headers=headers)
+        self.assertEqual(set(response.json()['users']), {str(self.user.pk), str(self.worker.pk)})
+        response = await self.async_client.get(reverse('async_task_detail', args=[self.tasks[0].pk]), {'expand': 'creator'}, headers=headers)
+        self.assertEqual(list(response.json()['users']), [str(self.user.pk)])
+
+    def test_renamed_user_changes_the_etag(self):
+        urls = ['/api/tasks/', f'/api/tasks/{self.tasks[0].pk}/']
+        etags = {}
+        for url in urls:
+            etags[url] = self.client.get(url, {'expand': 'executor'})['ETag']
+            response = self.client.get(url, {'expand': 'executor'}, HTTP_IF_NONE_MATCH=etags[url])
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.worker.username = 'renamed'
+        self.worker.save()
+        for url in urls:
+            response = self.client.get(url, {'expand': 'executor'}, HTTP_IF_NONE_MATCH=etags[url])
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.data['users'][str(self.worker.pk)]['username'], 'renamed')
+
+    async def test_async_renamed_user_changes_the_etag(self):
+        headers = {'authorization': f'Token {(await Token.objects.acreate(user=self.user)).key}'}
+        urls = [reverse('async_task_list'), reverse('async_task_detail', args=[self.tasks[0].pk])]
+        etags = {}
+        for url in urls:
+            etags[url] = (await self.async_client.get(url, {'expand': 'executor'}, headers=headers))['ETag']
+            response = await self.async_client.get(url, {'expand': 'executor'}, headers={**headers, 'if-none-match': etags[url]})
+            self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        await User.objects.filter(pk=self.worker.pk).aupdate(username='renamed')
+        for url in urls:
+            response = await self.async_client.get(url, {'expand': 'executor'}, headers={**headers, 'if-none-match': etags[url]})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.json()['users'][str(self.worker.pk)]['username'], 'renamed')
 
 
 class AutoLogoutMiddlewareTestCase(TestCase):
@@ -301,4 +1431,68 @@ class AutoLogoutMiddlewareTestCase(TestCase):
         response = self.client.get('/')
         self.assertFalse(response.wsgi_request.user.is_authenticated)
         messages_list = list(messages.get_messages(response.wsgi_request))
-        self.assertEqual(messages_list[0].message, 'You have been inactive for more than 1 minute. You have been automatically logged out')
\ No newline at end of file
+        self.assertEqual(messages_list[0].message, 'You have been inactive for more than 1 minute. You have been automatically logged out')
+
+    def test_activity_write_is_throttled(self):
+        self.client.login(username='userlpg', password='logpassword')
+        self.client.get('/')
+        first = self.client.session['last_activity']
+        self.client.get('/')
+        self.assertEqual(self.client.session['last_activity'], first)
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() + timezone.timedelta(seconds=30)):
+            self.client.get('/')
+        self.assertNotEqual(self.client.session['last_activity'], first)
+
+    def test_throttled_request_does_not_save_session(self):
+        self.client.login(username='userlpg', password='logpassword')
+        self.client.get('/')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/')
+        self.assertFalse(any(query['sql'].startswith('UPDATE') for query in queries.captured_queries))
+
+    @override_settings(AUTO_LOGOUT_TIMEOUT=90)
+    def test_message_follows_the_timeout(self):
+        self.client.login(username='userlpg', password='logpassword')
+        session = self.client.session
+        session['last_activity'] = (timezone.now() - timezone.timedelta(seconds=91)).isoformat()
+        session.save()
+        response = self.client.get('/')
+        self.assertEqual(list(messages.get_messages(response.wsgi_request))[0].message,
+                         'You have been inactive for more than 90 seconds. You have been automatically logged out')
+
+    def test_token_requests_do_not_create_sessions(self):
+        token = Token.objects.create(user=self.user_to_log)
+        response = self.client.get('/api/tasks/', HTTP_AUTHORIZATION=f'Token {token.key}')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+        self.assertFalse(Session.objects.exists())
+
+    @override_settings(AUTO_LOGOUT_ACTIVITY_STORE='cookie')
+    def test_cookie_from_an_earlier_login_is_ignored(self):
+        self.client.login(username='userlpg', password='logpassword')
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() - timezone.timedelta(seconds=300)):
+            self.client.get('/')
+        stale = self.client.cookies['last_activity'].value
+        self.client.logout()
+        self.client.login(username='userlpg', password='logpassword')
+        self.client.cookies['last_activity'] = stale
+        self.assertTrue(self.client.get('/').wsgi_request.user.is_authenticated)
+
+    @override_settings(AUTO_LOGOUT_ACTIVITY_STORE='cookie')
+    def test_cookie_store(self):
+        self.client.login(username='userlpg', password='logpassword')
+        response = self.client.get('/')
+        self.assertIn('last_activity', response.cookies)
+        self.assertNotIn('last_activity', self.client.session)
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() + timezone.timedelta(seconds=61)):
+            response = self.client.get('/')
+        self.assertFalse(response.wsgi_request.user.is_authenticated)
+
+    @override_settings(AUTO_LOGOUT_ACTIVITY_STORE='cache')
+    def test_cache_store(self):
+        self.client.login(username='userlpg', password='logpassword')
+        self.client.get('/')
+        self.assertNotIn('last_activity', self.client.session)
+        with mock.patch('django.utils.timezone.now', return_value=timezone.now() + timezone.timedelta(seconds=61)):
+            response = self.client.get('/')
+        self.assertFalse(response.wsgi_request.user.is_authenticated)
@@ -0,0 +1,124 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import Counter
+from urllib.parse import parse_qsl, urlencode
+from django.conf import settings
+from benchmarks import latency_report
+
+
+REDACTED = '[redacted]'
+SECRET_FIELD = re.compile(r'password|secret|token|csrf', re.IGNORECASE)
+TEXT_BODIES = ('application/json', 'application/x-www-form-urlencoded', 'text/')
+
+_write_lock = threading.Lock()
+
+
+def redact(value):
+    if isinstance(value, dict):
+        return {key: REDACTED if SECRET_FIELD.search(key) else redact(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [redact(item) for item in value]
+    return value
+
+
+def capture_body(request):
+    # The body as text with passwords and tokens blanked, or None when it is
+    # too big or not text (file uploads are never recorded).
+    content_type = request.content_type or ''
+    length = int(request.META.get('CONTENT_LENGTH') or 0)
+    if not length or length > settings.TRAFFIC_CAPTURE_MAX_BODY or not content_type.startswith(TEXT_BODIES):
+        return None
+    body = request.body.decode('utf-8', 'replace')
+    if content_type == 'application/x-www-form-urlencoded':
+        return urlencode([(key, REDACTED if SECRET_FIELD.search(key) else value) for key, value in parse_qsl(body, keep_blank_values=True)])
+    if content_type == 'application/json':
+        try:
+            return json.dumps(redact(json.loads(body)))
+        except ValueError:
+            return body
+    return body
+
+
+def identity(request):
+    # DRF copies the user it authenticated back onto the Django request.
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return None, None
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    scheme = header.split(' ', 1)[0].lower() if header else 'session'
+    return scheme, user.get_username()
+
+
+def record(entry):
+    path = settings.TRAFFIC_CAPTURE_FILE
+    line = json.dumps(entry) + '\n'
+    with _write_lock:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            if os.path.getsize(path) + len(line) > settings.TRAFFIC_CAPTURE_MAX_BYTES:
+                os.replace(path, f'{path}.1')
+        except FileNotFoundError:
+            pass
+        with open(path, 'a', encoding='utf-8') as capture:
+            capture.write(line)
+
+
+def read_capture(path):
+    with open(path, encoding='utf-8') as capture:
+        for line in capture:
+            if line.strip():
+                yield json.loads(line)
+
+
+def build_report(results, seconds):
+    # results: (route, status, latency) per replayed request.
+    routes = {}
+    for route, status, latency in results:
+        routes.setdefault(route, []).append((status, latency))
+    report = {'requests': len(results)}
+    report.update(latency_report([latency for _, _, latency in results], seconds))
+    report['statuses'] = dict(Counter(str(status) for _, status, _ in results))
+    report['routes'] = {}
+    for route, calls in sorted(routes.items()):
+        summary = {'requests': len(calls)}
+        summary.update(latency_report([latency for _, latency in calls]))
+        summary['statuses'] = dict(Counter(str(status) for status, _ in calls))
+        report['routes'][route] = summary
+    return report
+
+
+def compare(report, baseline):
+    def change(current, previous):
+        return {
+            'p50_ms': f"{current['p50_ms'] - previous['p50_ms']:+.2f}",
+            'p95_ms': f"{current['p95_ms'] - previous['p95_ms']:+.2f}",
+            'p99_ms': f"{current['p99_ms'] - previous['p99_ms']:+.2f}",
+        }
+    changes = {'overall': change(report, baseline), 'routes': {}}
+    if 'requests_per_second' in baseline:
+        changes['overall']['requests_per_second'] = (
+            f"{report['requests_per_second'] / baseline['requests_per_second'] - 1:+.1%}")
+    for route, current in report['routes'].items():
+        previous = baseline.get('routes', {}).get(route)
+        if previous:
+            changes['routes'][route] = change(current, previous)
+    return changes
+
+
+def timed(entries, speed):
+    # (seconds after the start to send it, entry); speed 0 sends everything
+    # at once, 2 replays twice as fast as it was recorded.
+    entries = sorted(entries, key=lambda entry: entry['at'])
+    if not entries:
+        return []
+    start = entries[0]['at']
+    return [((entry['at'] - start) / speed if speed else 0, entry) for entry in entries]
+
+
+def wait_until(moment):
+    delay = moment - time.perf_counter()
+    if delay > 0:
+        time.sleep(delay)
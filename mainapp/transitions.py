@@ -0,0 +1,75 @@
+from asgiref.sync import sync_to_async
+from django.db.models import Case, Value, When
+from django.utils import timezone
+from .models import TaskCard
+from .signals import notify
+
+
+UPPER = {
+    'New': 'In progress',
+    'In progress': 'In QA',
+    'In QA': 'Ready',
+    'Ready': 'Done',
+}
+LOWER = {target: source for source, target in UPPER.items()}
+
+EXECUTOR_TRANSITIONS = {
+    'New': ('In progress',),
+    'In progress': ('In QA', 'New'),
+    'In QA': ('Ready', 'In progress'),
+    'Ready': ('In QA',),
+}
+SUPERUSER_TRANSITIONS = {
+    'Ready': ('Done',),
+    'Done': ('Ready',),
+}
+
+
+def _step_expression(steps):
+    status_field = TaskCard._meta.get_field('status')
+    return Case(
+        *[When(status=source, then=Value(target, output_field=status_field)) for source, target in steps.items()],
+        output_field=status_field,
+    )
+
+
+STEPS = {
+    'upper': (UPPER, _step_expression(UPPER)),
+    'lower': (LOWER, _step_expression(LOWER)),
+}
+
+
+def allowed_transitions(user, task):
+    if user.is_authenticated and task.executor_id == user.pk:
+        return EXECUTOR_TRANSITIONS
+    if user.is_superuser:
+        return SUPERUSER_TRANSITIONS
+    return None
+
+
+def transition(pk, from_status, to_status):
+    # UPDATE ... WHERE id = %s AND status = %s: succeeds only if nobody moved
+    # the card since the caller saw it in from_status.
+    updated = TaskCard.objects.filter(pk=pk, status=from_status).update(status=to_status, update_at=timezone.now())
+    if updated:
+        notify([{'type': 'status', 'id': pk, 'status': to_status}])
+    return updated == 1
+
+
+async def atransition(pk, from_status, to_status):
+    updated = await TaskCard.objects.filter(pk=pk, status=from_status).aupdate(status=to_status, update_at=timezone.now())
+    if updated:
+        # on_commit needs the connection the UPDATE ran on.
+        await sync_to_async(notify)([{'type': 'status', 'id': pk, 'status': to_status}])
+    return updated == 1
+
+
+def step(pk, direction, from_status=None):
+    steps, expression = STEPS[direction]
+    if from_status is not None:
+        return from_status in steps and transition(pk, from_status, steps[from_status])
+    updated = TaskCard.objects.filter(pk=pk, status__in=list(steps)).update(status=expression, update_at=timezone.now())
+    if updated:
+        # The new status is not read back; board clients know the column order.
+        notify([{'type': 'status', 'id': pk, 'direction': direction}])
+    return updated == 1
@@ -1,4 +1,4 @@
-from .views import MainView, AboutView, TaskCardListView, TaskCardDetailView, TaskCardCreateView, TaskCardUpdateView, TaskCardDeleteView, UpperStatusTaskCardView, LowerStatusTaskCardView, SetExecutorView, TaskCardModelViewSet
+from .views import MainView, AboutView, TaskCardListView, TaskCardDetailView, TaskCardCreateView, TaskCardUpdateView, TaskCardDeleteView, UpperStatusTaskCardView, LowerStatusTaskCardView, SetExecutorView, ExecutorLookupView, BoardEventsView, AsyncTaskCardListView, AsyncTaskCardDetailView, AsyncTaskCardStatusView, MetricsView, ProfileListView, ProfileFileView, TaskCardModelViewSet
 from django.urls import path, include
 from rest_framework import routers
 
@@ -10,6 +10,9 @@ router.register('tasks', TaskCardModelViewSet)
 
 urlpatterns = [
     path('api/', include(router.urls)),
+    path('api/async/tasks/', AsyncTaskCardListView.as_view(), name='async_task_list'),
+    path('api/async/tasks/<int:pk>/', AsyncTaskCardDetailView.as_view(), name='async_task_detail'),
+    path('api/async/tasks/<int:pk>/status/', AsyncTaskCardStatusView.as_view(), name='async_task_status'),
     path('', MainView.as_view(), name = 'mainpage'),
     path('about/', AboutView.as_view(), name = 'aboutpage'),
     path('tasklist/', TaskCardListView.as_view(), name = 'tasks'),
@@ -20,4 +23,9 @@ urlpatterns = [
     path('tasks/<int:pk>/upper-status/', UpperStatusTaskCardView.as_view(), name='upper_task_status'),
     path('tasks/<int:pk>/lower-status/', LowerStatusTaskCardView.as_view(), name='lower_task_status'),
     path('tasks/<int:pk>/set-executor/', SetExecutorView.as_view(), name='set_executor'),
+    path('tasks/executors/', ExecutorLookupView.as_view(), name='executor_lookup'),
+    path('tasks/events/', BoardEventsView.as_view(), name='board_events'),
+    path('metrics', MetricsView.as_view(), name='metrics'),
+    path('profiles/', ProfileListView.as_view(), name='profiles'),
+    path('profiles/<str:name>/<str:kind>/', ProfileFileView.as_view(), name='profile_file'),
 ]
@@ -1,13 +1,45 @@
 from .models import TaskCard
-from django.views.generic import TemplateView, ListView, View, CreateView, UpdateView, DeleteView
+from django.views.generic import TemplateView, View, CreateView, UpdateView, DeleteView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.shortcuts import get_object_or_404, render, redirect
 from .forms import TaskCardForm, SetExecutorForm
+from . import transitions
+from .board import COLUMN_LIMIT, build_board, parse_cursors, prepare_cards
+from .board_cache import board_cache
+from .metrics import registry
+from .profiling import profile_file, recent_profiles
 from django.urls import reverse
-from .serializers import TaskCardSerializer, TaskCardSerializerForFilter
+from .serializers import TaskCardSerializer, TaskCardSerializerForFilter, TaskCardSyncSerializer, TaskCardExportFilterSerializer
+from .sync import changes_since, parse_limit
 from rest_framework.viewsets import ModelViewSet
 from mainapp.permissions import TaskCardPermission
-from rest_framework.filters import SearchFilter
+from .pagination import TaskCardCursorPagination, TaskCardSearchPagination
+from .search import search_tasks
+from .filters import StatusSearchFilter
+from .bulk import apply_bulk
+from .export import CONTENT_TYPES, aexport_chunks, export_chunks, filter_export
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework import status
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.contrib.auth import get_user
+from asgiref.sync import sync_to_async
+from .events import event_stream, hub
+from .conditional import alist_state, list_state, make_etag, not_modified, set_validators
+from .sync import decode_cursor, encode_cursor
+from .sparse import expanded_users, parse_expand, parse_fields, project
+from accountsapp.authentication import ProblemBookTokenAuthentication
+from rest_framework import exceptions, serializers
+from django.db.models import Q
+import json
+from django.contrib import messages
+from django.conf import settings
+from django.middleware.csrf import get_token
+from django.utils.crypto import constant_time_compare
+import hashlib
 
 
 
@@ -20,23 +52,61 @@ class AboutView(TemplateView):
     template_name = "about.html"
 
 
-class TaskCardListView(ListView):
-    model = TaskCard
+class TaskCardListView(TemplateView):
     template_name = 'tasks.html'
-    queryset = TaskCard.objects.all()
-    context_object_name = 'task_list'
+    column_limit = COLUMN_LIMIT
+
+    def get(self, request, *args, **kwargs):
+        state = list_state(TaskCard.objects.all())
+        # The board embeds CSRF tokens, so a new CSRF secret needs a new page.
+        get_token(request)
+        etag = make_etag(request, request.META['CSRF_COOKIE'], *state.values())
+        response = not_modified(request, etag, state['last_update'])
+        if response is not None:
+            return response
+        # Pending messages are rendered into the page, so it is not reused.
+        cacheable = not len(messages.get_messages(request))
+        content = board_cache.get(etag) if cacheable else None
+        if content is None:
+            response = super().get(request, *args, **kwargs).render()
+            if cacheable:
+                board_cache.set(etag, response.content)
+            response['X-Board-Cache'] = 'miss'
+        else:
+            response = HttpResponse(content)
+            response['X-Board-Cache'] = 'hit'
+        return set_validators(response, etag, state['last_update'])
 
     def get_context_data(self, **kwargs):
         context = super(TaskCardListView, self).get_context_data(**kwargs)
-        context['form'] = SetExecutorForm(user=self.request.user)
+        queryset = TaskCard.objects.all()
+        query = self.request.GET.get('q', '').strip()
+        if query:
+            queryset = search_tasks(queryset, query, ranked=False)
+        columns = build_board(queryset, cursors=parse_cursors(self.request.GET), limit=self.column_limit)
+        for column in columns:
+            if column.next_cursor is not None:
+                params = self.request.GET.copy()
+                params[column.cursor_param] = column.next_cursor
+                column.next_url = f'?{params.urlencode()}'
+        context['columns'] = prepare_cards(columns, self.request.user)
+        context['query'] = query
+        context['csrf_secret'] = self.request.META.get('CSRF_COOKIE')
+        context['card_cache_timeout'] = settings.BOARD_CARD_CACHE_TIMEOUT
         return context
 
 
 class TaskCardDetailView(LoginRequiredMixin, View):
     def get(self, request, pk):
-        task = get_object_or_404(TaskCard, pk=pk)
-        context = {'task': task}
-        return render(request, 'task_detail.html', context)
+        last_update = TaskCard.objects.filter(pk=pk).values_list('update_at', flat=True).first()
+        if last_update is None:
+            raise Http404
+        etag = make_etag(request, last_update)
+        response = not_modified(request, etag, last_update)
+        if response is None:
+            task = get_object_or_404(TaskCard.objects.select_related('creator', 'executor'), pk=pk)
+            response = set_validators(render(request, 'task_detail.html', {'task': task}), etag, task.update_at)
+        return response
     
 
 class TaskCardCreateView(LoginRequiredMixin, CreateView):
@@ -78,33 +148,19 @@ class TaskCardDeleteView(LoginRequiredMixin, DeleteView):
     
     
 class UpperStatusTaskCardView(View):
+    direction = 'upper'
+
     def post(self, request, pk):
-        task = get_object_or_404(TaskCard, pk=pk)
-        if task.status == 'New':
-            task.status = 'In progress'
-        elif task.status == 'In progress':
-            task.status = 'In QA'
-        elif task.status == 'In QA':
-            task.status = 'Ready'
-        elif task.status == 'Ready':
-            task.status = 'Done'
-        task.save()
+        from_status = request.POST.get('status')
+        if not transitions.step(pk, self.direction, from_status):
+            get_object_or_404(TaskCard, pk=pk)
+            if from_status is not None:
+                messages.warning(request, 'The task has already been moved by someone else')
         return redirect('tasks')
         
 
-class LowerStatusTaskCardView(View):
-    def post(self, request, pk):
-        task = get_object_or_404(TaskCard, pk=pk)
-        if task.status == 'In progress':
-            task.status = 'New'
-        elif task.status == 'In QA':
-            task.status = 'In progress'
-        elif task.status == 'Ready':
-            task.status = 'In QA'
-        elif task.status == 'Done':
-            task.status = 'Ready'
-        task.save()
-        return redirect('tasks')
+class LowerStatusTaskCardView(UpperStatusTaskCardView):
+    direction = 'lower'
     
 
 class SetExecutorView(View):
@@ -119,15 +175,313 @@ class SetExecutorView(View):
         return render(request, self.template_name, {'form': form, 'task': task})
 
 
+class ExecutorLookupView(LoginRequiredMixin, View):
+    page_size = 20
+    cache_timeout = 30
+
+    def get(self, request):
+        prefix = request.GET.get('q', '').strip()
+        after = request.GET.get('after', '')
+        scope = 'all' if request.user.is_superuser else request.user.id
+        key = 'executors:' + hashlib.md5(f'{scope}|{prefix}|{after}'.encode()).hexdigest()
+        payload = cache.get(key)
+        if payload is None:
+            users = User.objects.order_by('username')
+            if not request.user.is_superuser:
+                users = users.filter(id=request.user.id)
+            if prefix:
+                users = users.filter(username__startswith=prefix)
+            if after:
+                users = users.filter(username__gt=after)
+            rows = list(users.values('id', 'username')[:self.page_size + 1])
+            payload = {
+                'results': rows[:self.page_size],
+                'next': rows[self.page_size - 1]['username'] if len(rows) > self.page_size else None,
+            }
+            cache.set(key, payload, self.cache_timeout)
+        return JsonResponse(payload)
+
+
+class BoardEventsView(View):
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            return HttpResponse('Board events are only served by the ASGI application', status=501)
+        user = await sync_to_async(get_user)(request)
+        if not user.is_authenticated:
+            return HttpResponse(status=403)
+        subscription = hub.subscribe(user.pk)
+        response = StreamingHttpResponse(event_stream(subscription, max_age=settings.BOARD_EVENTS_MAX_AGE),
+                                         content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+class MetricsView(View):
+    def allowed(self, request):
+        # REMOTE_ADDR is the proxy's address behind a local reverse proxy, so
+        # the INTERNAL_IPS allowance is opt-in; scrapers send the token.
+        token = settings.REQUEST_METRICS_TOKEN
+        scheme, _, credentials = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+        return (request.user.is_superuser
+                or bool(token and scheme.lower() == 'bearer' and constant_time_compare(credentials, token))
+                or (settings.REQUEST_METRICS_ALLOW_INTERNAL_IPS and request.META.get('REMOTE_ADDR') in settings.INTERNAL_IPS))
+
+    def get(self, request):
+        if not settings.REQUEST_METRICS_ENABLED:
+            raise Http404
+        if not self.allowed(request):
+            return HttpResponse(status=403)
+        stats = board_cache.stats()
+        extra = [
+            '# TYPE board_cache_hits_total counter', f"board_cache_hits_total {stats['hits']}",
+            '# TYPE board_cache_misses_total counter', f"board_cache_misses_total {stats['misses']}",
+            '# TYPE board_cache_entries gauge', f"board_cache_entries {stats['entries']}",
+        ]
+        return HttpResponse(registry.render(extra), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+class ProfileListView(LoginRequiredMixin, View):
+    def get(self, request):
+        if not request.user.is_superuser:
+            return HttpResponse(status=403)
+        return render(request, 'profiles.html', {'profiles': recent_profiles()})
+
+
+class ProfileFileView(LoginRequiredMixin, View):
+    def get(self, request, name, kind):
+        if not request.user.is_superuser:
+            return HttpResponse(status=403)
+        path = profile_file(name, kind)
+        if path is None:
+            raise Http404
+        return FileResponse(path.open('rb'), as_attachment=kind != 'sql', filename=path.name)
+
+
+class AsyncTaskCardAPIView(View):
+    # Token authentication only: loading a session would need the sync ORM.
+    authentication = ProblemBookTokenAuthentication()
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        view.csrf_exempt = True
+        return view
+
+    async def dispatch(self, request, *args, **kwargs):
+        try:
+            auth = await self.authentication.aauthenticate(request)
+        except exceptions.AuthenticationFailed as exc:
+            return self.unauthorized(exc.detail)
+        if auth is None:
+            return self.unauthorized('Authentication credentials were not provided.')
+        request.user, request.auth = auth
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        except Http404:
+            return JsonResponse({'detail': 'Not found.'}, status=404)
+
+    def unauthorized(self, detail):
+        response = JsonResponse({'detail': detail}, status=401)
+        response['WWW-Authenticate'] = self.authentication.keyword
+        return response
+
+    async def get_task(self, pk, fields=None, expand=()):
+        try:
+            return await project(TaskCard.objects.all(), fields, expand).aget(pk=pk)
+        except TaskCard.DoesNotExist:
+            raise Http404
+
+
+class AsyncTaskCardListView(AsyncTaskCardAPIView):
+    async def get(self, request):
+        try:
+            fields = parse_fields(request.GET.get('fields'), TaskCardSerializer)
+            expand = parse_expand(request.GET.get('expand'))
+        except serializers.ValidationError as exc:
+            return JsonResponse(exc.detail, status=400)
+        state = await alist_state(TaskCard.objects.all())
+        etag = make_etag(request, *state.values())
+        response = None if expand else not_modified(request, etag, state['last_update'], check_messages=False)
+        if response is not None:
+            return response
+        try:
+            page_size = max(1, min(int(request.GET['page_size']), TaskCardCursorPagination.max_page_size))
+        except (KeyError, ValueError):
+            page_size = TaskCardCursorPagination.page_size
+        queryset = project(TaskCard.objects.order_by('-create_at', '-id'), fields, expand)
+        if request.GET.get('cursor'):
+            try:
+                create_at, pk = decode_cursor(request.GET['cursor'])
+            except serializers.ValidationError:
+                return JsonResponse({'cursor': ['Invalid cursor']}, status=400)
+            queryset = queryset.filter(Q(create_at__lt=create_at) | Q(create_at=create_at, id__lt=pk))
+        tasks = [task async for task in queryset[:page_size + 1]]
+        next_url = None
+        if len(tasks) > page_size:
+            tasks = tasks[:page_size]
+            query = request.GET.copy()
+            query['cursor'] = encode_cursor(tasks[-1].create_at, tasks[-1].pk)
+            next_url = request.build_absolute_uri(f'?{query.urlencode()}')
+        payload = {'next': next_url, 'results': TaskCardSerializer(tasks, many=True, fields=fields).data}
+        if expand:
+            payload['users'] = expanded_users(tasks, expand)
+            etag = make_etag(request, *state.values(), payload['users'])
+            response = not_modified(request, etag, state['last_update'], check_messages=False)
+            if response is not None:
+                return response
+        response = JsonResponse(payload)
+        return set_validators(response, etag, state['last_update'])
+
+
+class AsyncTaskCardDetailView(AsyncTaskCardAPIView):
+    async def get(self, request, pk):
+        try:
+            fields = parse_fields(request.GET.get('fields'), TaskCardSerializer)
+            expand = parse_expand(request.GET.get('expand'))
+        except serializers.ValidationError as exc:
+            return JsonResponse(exc.detail, status=400)
+        task = await self.get_task(pk, fields, expand)
+        users = expanded_users([task], expand) if expand else None
+        etag = make_etag(request, task.pk, task.update_at, users)
+        response = not_modified(request, etag, task.update_at, check_messages=False)
+        if response is None:
+            data = TaskCardSerializer(task, fields=fields).data
+            if users is not None:
+                data['users'] = users
+            response = set_validators(JsonResponse(data), etag, task.update_at)
+        return response
+
+
+class AsyncTaskCardStatusView(AsyncTaskCardAPIView):
+    async def post(self, request, pk):
+        try:
+            payload = json.loads(request.body)
+        except ValueError:
+            return JsonResponse({'detail': 'JSON parse error'}, status=400)
+        if not isinstance(payload, dict) or 'status' not in payload:
+            return JsonResponse({'status': ['This field is required.']}, status=400)
+        task = await self.get_task(pk)
+        # Same checks as PATCH /api/tasks/<pk>/; none of them touch the database.
+        serializer = TaskCardSerializer(task, data={'status': payload['status']}, partial=True, context={'request': request})
+        try:
+            serializer.is_valid(raise_exception=True)
+            _, new_status = serializer.apply_changes(task, serializer.validated_data)
+            if new_status is not None:
+                if not await transitions.atransition(task.pk, task.status, new_status):
+                    raise serializers.ValidationError("The task status has been changed by someone else")
+                task.status = new_status
+        except serializers.ValidationError as exc:
+            return JsonResponse(exc.detail, safe=False, status=400)
+        return JsonResponse(TaskCardSerializer(task).data)
+
+
 class TaskCardModelViewSet(ModelViewSet):
     queryset = TaskCard.objects.all()
     serializer_class = TaskCardSerializer
     permission_classes = [TaskCardPermission]
-    filter_backends = [SearchFilter]
+    pagination_class = TaskCardCursorPagination
+    filter_backends = [StatusSearchFilter]
     search_fields = ['status']
 
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if 'q' in self.request.query_params:
+                self._paginator = TaskCardSearchPagination()
+            else:
+                self._paginator = self.pagination_class()
+        return self._paginator
+
+    @property
+    def sparse_fields(self):
+        # ?fields= on reads: the same names trim the serializer and the SELECT.
+        if not hasattr(self, '_sparse_fields'):
+            value = self.request.query_params.get('fields') if self.action in ('list', 'retrieve') else None
+            self._sparse_fields = parse_fields(value, self.get_serializer_class())
+        return self._sparse_fields
+
+    @property
+    def expand(self):
+        # ?expand=creator,executor: users come from the same query through
+        # select_related and are listed once, in a top-level `users` table.
+        if not hasattr(self, '_expand'):
+            value = self.request.query_params.get('expand') if self.action in ('list', 'retrieve') else None
+            self._expand = parse_expand(value)
+        return self._expand
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list' and 'q' in self.request.query_params:
+            queryset = search_tasks(queryset, self.request.query_params['q'])
+        return project(queryset, self.sparse_fields, self.expand)
+
+    def paginate_queryset(self, queryset):
+        self.page_tasks = super().paginate_queryset(queryset)
+        return self.page_tasks
+
+    def get_serializer(self, *args, **kwargs):
+        if self.sparse_fields is not None:
+            kwargs['fields'] = self.sparse_fields
+        return super().get_serializer(*args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        # A user renamed through a queryset update moves nothing in the task
+        # table, so with ?expand= the validator also covers the page's users
+        # and is only known once the page is loaded.
+        state = list_state(self.filter_queryset(self.get_queryset()))
+        etag = make_etag(request, *state.values())
+        response = None if self.expand else not_modified(request, etag, state['last_update'])
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+            if self.expand:
+                response.data['users'] = expanded_users(self.page_tasks, self.expand)
+                etag = make_etag(request, *state.values(), response.data['users'])
+                response = not_modified(request, etag, state['last_update']) or response
+            response = set_validators(response, etag, state['last_update'])
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        users = expanded_users([instance], self.expand) if self.expand else None
+        etag = make_etag(request, instance.pk, instance.update_at, users)
+        response = not_modified(request, etag, instance.update_at)
+        if response is None:
+            data = self.get_serializer(instance).data
+            if users is not None:
+                data['users'] = users
+            response = set_validators(Response(data), etag, instance.update_at)
+        return response
+
     def get_serializer_class(self):
         if 'search' in self.request.query_params:
             return TaskCardSerializerForFilter
         return TaskCardSerializer
 
+    @action(detail=False)
+    def sync(self, request):
+        feed = changes_since(request.query_params.get('since'), parse_limit(request.query_params.get('limit')))
+        feed['changes'] = TaskCardSyncSerializer(feed['changes'], many=True).data
+        return Response(feed)
+
+    @action(detail=False)
+    def export(self, request):
+        # ?output=, not ?format=: DRF reserves format for its renderers.
+        params = TaskCardExportFilterSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        filters = dict(params.validated_data)
+        output = filters.pop('output')
+        chunks = export_chunks(filter_export(TaskCard.objects.all(), **filters), output)
+        if isinstance(request._request, ASGIRequest):
+            chunks = aexport_chunks(chunks)
+        response = StreamingHttpResponse(chunks, content_type=CONTENT_TYPES[output])
+        response['Content-Disposition'] = f'attachment; filename="tasks.{output}"'
+        return response
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        applied, results = apply_bulk(request.data, request)
+        if not applied:
+            return Response({'errors': results}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({'results': results})
+
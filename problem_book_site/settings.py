@@ -45,12 +45,16 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'mainapp.middleware.SlowQueryMiddleware',
+    'mainapp.middleware.TrafficRecorderMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'mainapp.middleware.RequestMetricsMiddleware',
+    'mainapp.middleware.RequestProfilingMiddleware',
     'mainapp.middleware.AutoLogoutMiddleware',
 ]
 
@@ -147,3 +151,89 @@ REST_FRAMEWORK = {
     ],
     'DEFAULT_FILTER_BACKENDS': ['rest_framework.filters.SearchFilter']
 }
+
+# Inactivity logout (mainapp.middleware.AutoLogoutMiddleware)
+# The activity store is one of 'session', 'cache' or 'cookie'; the stored
+# timestamp is only refreshed once per granularity window. Users are logged
+# out TIMEOUT seconds after the stored time, which can be up to GRANULARITY
+# seconds before their last request: set GRANULARITY to 0 for an exact timeout.
+
+AUTO_LOGOUT_TIMEOUT = 60
+AUTO_LOGOUT_ACTIVITY_GRANULARITY = 10
+AUTO_LOGOUT_ACTIVITY_STORE = 'session'
+
+# Rendered board cache (mainapp.board_cache)
+# Pages are kept per viewer in each process (LRU, TIMEOUT seconds), keyed by
+# the page ETag. The ETag comes from the task table (max update_at, max id,
+# newest tombstone), so writes from other workers and commands are seen at once.
+
+BOARD_CACHE_MAX_ENTRIES = 256
+BOARD_CACHE_TIMEOUT = 60
+
+# Rendered cards ({% cache %} fragments in task_card.html) outlive board
+# versions: a card is only re-rendered once its own update_at moves.
+
+BOARD_CARD_CACHE_TIMEOUT = 300
+
+# Board events (/tasks/events/, ASGI only)
+# Each stream ends after MAX_AGE seconds and the browser reconnects: Django
+# 4.2 is not told when a client goes away, so this bounds how long a dead
+# stream is kept. A user's oldest stream is closed past 3 at once.
+
+BOARD_EVENTS_MAX_AGE = 300
+
+# Request metrics (mainapp.middleware.RequestMetricsMiddleware, /metrics)
+# Latency, SQL query count and SQL time per view, in Prometheus text format.
+# A request that runs one query shape THRESHOLD times or more is counted as a
+# suspected N+1. When disabled the middleware drops out at startup.
+# /metrics is served to superusers and to scrapers sending
+# `Authorization: Bearer <TOKEN>` (an empty TOKEN disables that). Set
+# ALLOW_INTERNAL_IPS to also serve INTERNAL_IPS, but not behind a reverse
+# proxy on the same host: every request would come from 127.0.0.1.
+
+REQUEST_METRICS_ENABLED = True
+REQUEST_METRICS_REPEATED_QUERY_THRESHOLD = 10
+REQUEST_METRICS_TOKEN = ''
+REQUEST_METRICS_ALLOW_INTERNAL_IPS = False
+INTERNAL_IPS = ['127.0.0.1']
+
+# Request profiling (mainapp.middleware.RequestProfilingMiddleware, /profiles/)
+# A request is profiled when it sends `X-Profile: <TOKEN>` (or any X-Profile
+# value from a logged-in superuser), or at random with SAMPLE_RATE. Each
+# profile is a cProfile dump (.pstats), stacks sampled every INTERVAL seconds
+# in collapsed format for flamegraphs (.collapsed) and the SQL it ran (.json);
+# only the newest KEEP are kept in DIR. An empty TOKEN disables the header
+# for everyone but superusers.
+
+REQUEST_PROFILING_ENABLED = True
+REQUEST_PROFILING_TOKEN = ''
+REQUEST_PROFILING_SAMPLE_RATE = 0.0
+REQUEST_PROFILING_INTERVAL = 0.001
+REQUEST_PROFILING_DIR = BASE_DIR / 'var' / 'profiles'
+REQUEST_PROFILING_KEEP = 50
+
+# Slow-query log (mainapp.middleware.SlowQueryMiddleware, manage.py slow_queries)
+# Statements slower than THRESHOLD_MS are appended to LOG as JSON lines with
+# their shape, view and calling line; LOG rolls over to LOG.1 at MAX_BYTES.
+# With EXPLAIN on, the first slow statement of each shape also gets its plan
+# (EXPLAIN ANALYZE for reads on PostgreSQL, EXPLAIN QUERY PLAN on SQLite).
+# Off by default; when disabled the middleware drops out at startup.
+
+SLOW_QUERY_ENABLED = False
+SLOW_QUERY_THRESHOLD_MS = 100
+SLOW_QUERY_EXPLAIN = False
+SLOW_QUERY_LOG = BASE_DIR / 'var' / 'slow_queries.jsonl'
+SLOW_QUERY_LOG_MAX_BYTES = 10 * 1024 * 1024
+
+# Traffic capture (mainapp.middleware.TrafficRecorderMiddleware, manage.py replay)
+# A SAMPLE_RATE share of requests is appended to FILE as JSON lines: method,
+# path, query, text body (passwords, tokens and CSRF values blanked, nothing
+# over MAX_BODY bytes), who made it and how (session, token or basic), status
+# and time. FILE rolls over to FILE.1 at MAX_BYTES.
+
+TRAFFIC_CAPTURE_ENABLED = False
+TRAFFIC_CAPTURE_SAMPLE_RATE = 1.0
+TRAFFIC_CAPTURE_FILE = BASE_DIR / 'var' / 'traffic' / 'requests.jsonl'
+TRAFFIC_CAPTURE_MAX_BYTES = 50 * 1024 * 1024
+TRAFFIC_CAPTURE_MAX_BODY = 64 * 1024
+TRAFFIC_CAPTURE_EXCLUDE = ['/static/', '/metrics', '/profiles/', '/tasks/events/']
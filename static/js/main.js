@@ -7,7 +7,11 @@ function plusSlides(n) {
 
 function showSlides(n) {
   let i;
-  const slides = document.getElementsByClassName("carousel-container")[0].children;
+  const container = document.getElementsByClassName("carousel-container")[0];
+  if (!container) {
+    return;
+  }
+  const slides = container.children;
   if (n > slides.length) {
     slideIndex = 1;
   }
@@ -19,3 +23,120 @@ function showSlides(n) {
   }
   slides[slideIndex - 1].style.display = "block";
 }
+
+function loadExecutors(picker, after) {
+  const input = picker.querySelector("input");
+  const select = picker.querySelector("select");
+  const params = new URLSearchParams({ q: input.value.trim() });
+  if (after) {
+    params.set("after", after);
+  }
+  fetch(`${picker.dataset.source}?${params}`, { credentials: "same-origin" })
+    .then((response) => response.json())
+    .then((page) => {
+      const selected = select.value;
+      if (!after) {
+        select.innerHTML = '<option value="">---------</option>';
+      } else {
+        select.querySelector("option[data-more]")?.remove();
+      }
+      for (const user of page.results) {
+        select.add(new Option(user.username, user.id, false, String(user.id) === selected));
+      }
+      if (page.next) {
+        const more = new Option("More...", "");
+        more.dataset.more = page.next;
+        select.add(more);
+      }
+    });
+}
+
+document.addEventListener("DOMContentLoaded", () => {
+  for (const picker of document.getElementsByClassName("executor-picker")) {
+    const input = picker.querySelector("input");
+    const select = picker.querySelector("select");
+    let timer = null;
+    const open = () => {
+      if (!picker.dataset.loaded) {
+        picker.dataset.loaded = "1";
+        loadExecutors(picker);
+      }
+    };
+    input.addEventListener("focus", open);
+    select.addEventListener("mousedown", open);
+    input.addEventListener("input", () => {
+      clearTimeout(timer);
+      timer = setTimeout(() => loadExecutors(picker), 250);
+    });
+    select.addEventListener("change", () => {
+      const option = select.selectedOptions[0];
+      if (option && option.dataset.more) {
+        loadExecutors(picker, option.dataset.more);
+      }
+    });
+  }
+});
+
+const BOARD_COLUMNS = ["New", "In progress", "In QA", "Ready", "Done"];
+
+function placeCard(board, card, status) {
+  const column = board.querySelector(`.status[data-status="${status}"]`);
+  if (!column) {
+    card.remove();
+    return;
+  }
+  const cards = column.querySelectorAll(".taskd");
+  if (cards.length) {
+    cards[cards.length - 1].after(card);
+  } else {
+    column.querySelector("h1").after(card);
+  }
+  for (const input of card.querySelectorAll('input[name="status"]')) {
+    input.value = status;
+  }
+}
+
+function applyBoardEvent(board, event) {
+  const card = board.querySelector(`.taskd[data-task-id="${event.id}"]`);
+  if (event.type === "create" && !card) {
+    const created = document.createElement("div");
+    created.className = "taskd";
+    created.dataset.taskId = event.id;
+    created.innerHTML = '<h2></h2><a><h3 class="task-text"></h3></a>';
+    created.querySelector("h2").textContent = `Creator: ${event.creator || ""}`;
+    created.querySelector("a").href = board.dataset.detailUrl.replace("/0/", `/${event.id}/`);
+    created.querySelector("h3").textContent = event.text || "";
+    placeCard(board, created, event.status);
+  } else if (!card) {
+    return;
+  } else if (event.type === "delete") {
+    card.remove();
+  } else if (event.type === "update") {
+    card.querySelector(".task-text").textContent = event.text || "";
+  } else if (event.type === "status") {
+    let status = event.status;
+    if (!status) {
+      const current = BOARD_COLUMNS.indexOf(card.closest(".status").dataset.status);
+      status = BOARD_COLUMNS[current + (event.direction === "upper" ? 1 : -1)];
+    }
+    placeCard(board, card, status);
+  } else if (event.type === "executor") {
+    const select = card.querySelector('.executor-picker select[name="executor"]');
+    if (select && event.executor) {
+      select.innerHTML = "";
+      select.add(new Option(event.executor_name || `#${event.executor}`, event.executor, true, true));
+    }
+  }
+}
+
+document.addEventListener("DOMContentLoaded", () => {
+  const board = document.querySelector(".bord[data-events]");
+  if (!board || !window.EventSource) {
+    return;
+  }
+  const source = new EventSource(board.dataset.events);
+  for (const type of ["create", "update", "status", "executor", "delete"]) {
+    source.addEventListener(type, (message) => applyBoardEvent(board, JSON.parse(message.data)));
+  }
+  source.addEventListener("resync", () => window.location.reload());
+});